@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+"""Benchmarks of the surveyqq raw and enriched backends.
+
+Items are generated with `SurveyGenerator` and uploaded to an in-memory
+stand-in of Elasticsearch, so the results measure the work done by the
+backends and not the cluster. Run from the root of the repository:
+
+    python -m benchmarks.bench_surveyqq --items 5000 --repeat 3 --json results.json
+
+Each benchmark is run `repeat` times over fresh copies of the items and
+the best time is reported, together with the throughput in items per
+second and the size of the bulk bodies uploaded.
+"""
+
+import argparse
+import copy
+import json
+import time
+
+from grimoire_elk_surveyqq.enriched.surveyqq import SurveyqqEnrich
+from grimoire_elk_surveyqq.identities.surveyqq import SurveyqqIdentities
+from grimoire_elk_surveyqq.pipeline import stream_items
+from grimoire_elk_surveyqq.raw.surveyqq import SurveyqqOcean
+
+from .generator import SurveyGenerator
+
+
+class FakeElastic:
+    """In-memory stand-in of `grimoire_elk.elastic.ElasticSearch`.
+
+    Bulk bodies are counted and discarded.
+    """
+    def __init__(self, index, max_items_bulk=1000):
+        self.url = "http://localhost:9200"
+        self.index = index
+        self.major = '6'
+        self.max_items_bulk = max_items_bulk
+        self.bulks = 0
+        self.bytes = 0
+
+    def get_bulk_url(self):
+        return "{}/{}/items/_bulk".format(self.url, self.index)
+
+    def safe_put_bulk(self, url, bulk_json):
+        if isinstance(bulk_json, str):
+            bulk_json = bulk_json.encode('utf-8')
+
+        self.bulks += 1
+        self.bytes += len(bulk_json)
+        return bulk_json.count(b'\n') // 2
+
+
+class FakeOcean:
+    """Ocean backend returning a list of items, as read from the raw index"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def fetch(self):
+        return iter(self.items)
+
+
+def get_ocean(compact=False):
+    ocean = SurveyqqOcean(None)
+    ocean.elastic = FakeElastic('surveyqq_raw')
+    ocean.set_compact(compact)
+    return ocean
+
+
+def get_enrich():
+    enrich = SurveyqqEnrich()
+    enrich.set_elastic(FakeElastic('surveyqq_enriched'))
+    return enrich
+
+
+def bench_fix_item(items, compact=False):
+    ocean = get_ocean(compact)
+    for item in items:
+        ocean._fix_item(item)
+
+
+def bench_anonymize_item(items):
+    for item in items:
+        SurveyqqIdentities.anonymize_item(item)
+
+
+def bench_anonymize_items(items):
+    for _ in SurveyqqIdentities.anonymize_items(items):
+        pass
+
+
+def bench_get_rich_item(items):
+    enrich = get_enrich()
+    for item in items:
+        enrich.get_rich_item(item)
+
+
+def bench_enrich_items(items, workers=None):
+    enrich = get_enrich()
+    enrich.set_workers(workers)
+    enrich.enrich_items(FakeOcean(items))
+    return enrich.elastic
+
+
+def bench_stream(items, compact=False):
+    ocean = get_ocean(compact)
+    enrich = get_enrich()
+    stream_items(ocean, enrich, iter(items))
+    return ocean.elastic, enrich.elastic
+
+
+BENCHMARKS = [
+    ('fix_item', bench_fix_item),
+    ('fix_item_compact', lambda items: bench_fix_item(items, compact=True)),
+    ('anonymize_item', bench_anonymize_item),
+    ('anonymize_items', bench_anonymize_items),
+    ('get_rich_item', bench_get_rich_item),
+    ('enrich_items', bench_enrich_items),
+    ('stream', bench_stream),
+    ('stream_compact', lambda items: bench_stream(items, compact=True))
+]
+
+
+def run(items, repeat, names=None):
+    """Run the benchmarks over copies of `items`.
+
+    :returns: dict with the results of each benchmark
+    """
+    results = {}
+    for name, bench in BENCHMARKS:
+        if names and name not in names:
+            continue
+
+        best = None
+        uploaded = 0
+        for _ in range(repeat):
+            copies = copy.deepcopy(items)
+            start = time.perf_counter()
+            elastic = bench(copies)
+            elapsed = time.perf_counter() - start
+
+            if best is None or elapsed < best:
+                best = elapsed
+            if elastic:
+                elastics = elastic if isinstance(elastic, tuple) else (elastic,)
+                uploaded = sum(e.bytes for e in elastics)
+
+        results[name] = {
+            'items': len(items),
+            'seconds': best,
+            'items_per_second': len(items) / best,
+            'bulk_bytes': uploaded
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the surveyqq backends")
+    parser.add_argument('--items', type=int, default=2000, help="number of raw items")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each benchmark")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the item generator")
+    parser.add_argument('--max-comments', type=int, default=20, help="maximum comments per issue")
+    parser.add_argument('--max-labels', type=int, default=4, help="maximum labels per issue")
+    parser.add_argument('--invalid-ratio', type=float, default=0.05,
+                        help="ratio of answers with an invalid issue link")
+    parser.add_argument('--only', nargs='*', help="benchmarks to run")
+    parser.add_argument('--json', help="file to store the results")
+    args = parser.parse_args()
+
+    generator = SurveyGenerator(seed=args.seed, max_comments=args.max_comments,
+                                max_labels=args.max_labels, invalid_ratio=args.invalid_ratio)
+    items = generator.get_items(args.items)
+
+    results = run(items, args.repeat, args.only)
+
+    print("{:<20} {:>10} {:>14} {:>14}".format("benchmark", "seconds", "items/s", "bulk bytes"))
+    for name, result in results.items():
+        print("{:<20} {:>10.3f} {:>14.1f} {:>14}".format(name, result['seconds'],
+                                                         result['items_per_second'],
+                                                         result['bulk_bytes']))
+
+    if args.json:
+        with open(args.json, 'w') as fd:
+            json.dump({'args': vars(args), 'results': results}, fd, indent=4)
+
+
+if __name__ == '__main__':
+    main()
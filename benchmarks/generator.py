@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+"""Synthetic raw items of the surveyqq backend.
+
+Items have the structure of the items fetched by perceval-surveyqq: an
+answer to a survey about a Gitee issue, the issue and its comments.
+Generation is deterministic for a given seed.
+"""
+
+import copy
+import datetime
+import random
+import uuid
+
+
+INVALID_LINKS = ["Invalid Issue Link", "Can't get message about Issue"]
+ISSUE_STATES = ['open', 'progressing', 'closed', 'rejected']
+LABELS = ['bug', 'feature', 'question', 'documentation', 'security',
+          'performance', 'good-first-issue', 'wontfix', 'duplicate', 'help-wanted']
+MILESTONES = [None, 'v1.0', 'v1.1', 'v2.0']
+REASONS = ['response time', 'solution quality', 'communication', 'documentation']
+PARTICIPATED = ['reporter', 'developer', 'user']
+APPEALS = ['faster answers', 'better docs', 'more tests']
+
+# Probability of a detractor, passive and promoter score
+SCORE_WEIGHTS = (0.2, 0.3, 0.5)
+
+TZ = datetime.timezone(datetime.timedelta(hours=8))
+START_DATE = datetime.datetime(2021, 1, 1, tzinfo=TZ)
+
+
+class SurveyGenerator:
+    """Generator of synthetic surveyqq raw items.
+
+    :param seed: seed of the random generator
+    :param users: number of distinct Gitee users
+    :param surveys: number of distinct surveys
+    :param answers_per_issue: mean number of answers about the same issue
+    :param max_comments: maximum number of comments of an issue
+    :param max_labels: maximum number of labels of an issue
+    :param invalid_ratio: ratio of answers with an invalid issue link
+    :param score_weights: probability of a detractor, passive and promoter score
+    """
+    def __init__(self, seed=0, users=500, surveys=3, answers_per_issue=3,
+                 max_comments=20, max_labels=4, invalid_ratio=0.05,
+                 score_weights=SCORE_WEIGHTS):
+        self.random = random.Random(seed)
+        self.users = ["user%d" % i for i in range(users)] + ["ci-bot", "robot-bot"]
+        self.user_ids = {login: i for i, login in enumerate(self.users)}
+        self.surveys = [self.__get_questions(i) for i in range(surveys)]
+        self.answers_per_issue = answers_per_issue
+        self.max_comments = max_comments
+        self.max_labels = max_labels
+        self.invalid_ratio = invalid_ratio
+        self.score_weights = score_weights
+        self.issues = []
+
+    @staticmethod
+    def __get_questions(survey_id):
+        titles = ['Gitee login', 'Email', 'Issue link', 'Score',
+                  'Reasons', 'Why did you participate', 'What do you expect']
+        return [{'id': survey_id * 100 + i, 'title': title} for i, title in enumerate(titles)]
+
+    def __get_date(self, days=365):
+        return START_DATE + datetime.timedelta(seconds=self.random.randint(0, days * 86400))
+
+    def __get_user(self, login):
+        return {
+            'id': self.user_ids[login],
+            'login': login,
+            'name': login,
+            'avatar_url': "https://gitee.com/assets/no_portrait.png",
+            'html_url': "https://gitee.com/" + login,
+            'type': 'User'
+        }
+
+    def __get_issue(self):
+        number = len(self.issues)
+        created_at = self.__get_date()
+        state = self.random.choice(ISSUE_STATES)
+        author = self.random.choice(self.users[:-2])
+
+        comments = []
+        date = created_at
+        for _ in range(self.random.randint(0, self.max_comments)):
+            date += datetime.timedelta(minutes=self.random.randint(1, 3000))
+            comments.append({
+                'id': self.random.randint(1, 10 ** 8),
+                'body': "Comment text " * self.random.randint(1, 20),
+                'user': self.__get_user(self.random.choice(self.users)),
+                'created_at': date.isoformat(),
+                'updated_at': date.isoformat()
+            })
+
+        labels = [{'id': i, 'name': name, 'color': 'ffffff'}
+                  for i, name in enumerate(self.random.sample(LABELS, self.random.randint(0, self.max_labels)))]
+        milestone = self.random.choice(MILESTONES)
+        assignee = self.random.choice([None, self.random.choice(self.users[:-2])])
+
+        issue = {
+            'id': number,
+            'number': "I%06d" % number,
+            'url': "https://gitee.com/api/v5/repos/owner/repo/issues/I%06d" % number,
+            'html_url': "https://gitee.com/owner/repo/issues/I%06d" % number,
+            'title': "Issue %d" % number,
+            'body': "Issue description " * self.random.randint(1, 50),
+            'state': state,
+            'user': self.__get_user(author),
+            'assignee': self.__get_user(assignee) if assignee else None,
+            'labels': labels,
+            'milestone': {'id': 1, 'title': milestone} if milestone else None,
+            'created_at': created_at.isoformat(),
+            'updated_at': date.isoformat(),
+            'finished_at': None if state in ['open', 'progressing'] else
+            (date + datetime.timedelta(days=1)).isoformat(),
+            'comments': len(comments)
+        }
+        self.issues.append((issue, comments))
+        return issue, comments
+
+    def __get_score(self):
+        bucket = self.random.choices([(0, 6), (7, 8), (9, 10)], weights=self.score_weights)[0]
+        return self.random.randint(*bucket)
+
+    def get_item(self):
+        """Generate a raw item"""
+
+        survey_id = self.random.randrange(len(self.surveys))
+        login = self.random.choice(self.users[:-2])
+        started_at = self.__get_date()
+
+        if self.random.random() < self.invalid_ratio:
+            issue, comments = self.random.choice(INVALID_LINKS), []
+        elif self.issues and self.random.random() > 1.0 / self.answers_per_issue:
+            issue, comments = self.random.choice(self.issues)
+        else:
+            issue, comments = self.__get_issue()
+
+        values = [
+            login,
+            login + "@example.com",
+            issue['html_url'] if isinstance(issue, dict) else "https://gitee.com/wrong",
+            str(self.__get_score())
+        ]
+        questions = []
+        for i, question in enumerate(self.surveys[survey_id]):
+            question = dict(question)
+            if i < len(values):
+                question['text'] = values[i]
+                question['options'] = []
+            else:
+                choices = [REASONS, PARTICIPATED, APPEALS][i - len(values)]
+                question['text'] = None
+                question['options'] = [{'text': text} for text in
+                                       self.random.sample(choices, self.random.randint(1, 2))]
+            questions.append(question)
+
+        item_uuid = uuid.UUID(int=self.random.getrandbits(128)).hex
+        timestamp = started_at.timestamp()
+
+        return {
+            'backend_name': 'SurveyQQ',
+            'backend_version': '0.1.0',
+            'perceval_version': '0.17.0',
+            'category': 'issue',
+            'classified_fields_filtered': None,
+            'origin': 'https://wj.qq.com/survey/%d' % survey_id,
+            'tag': 'https://wj.qq.com/survey/%d' % survey_id,
+            'uuid': item_uuid,
+            'timestamp': timestamp,
+            'updated_on': timestamp,
+            'search_fields': {'item_id': item_uuid},
+            'data': {
+                'id': item_uuid,
+                'started_at': started_at.isoformat(),
+                'answer': [{'survey_id': survey_id, 'questions': questions}],
+                'issue_data': copy.deepcopy(issue),
+                'comment_data': copy.deepcopy(comments)
+            }
+        }
+
+    def get_items(self, count):
+        """Generate a list of `count` raw items"""
+
+        return [self.get_item() for _ in range(count)]
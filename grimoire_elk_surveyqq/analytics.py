@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+"""Columnar snapshots and reports of the enriched survey answers.
+
+The enriched answers are read in bulk with a sliced scroll into a
+pandas DataFrame, which can be stored as a Parquet file and used to
+compute the reports without a loop per answer:
+
+    python -m grimoire_elk_surveyqq.analytics http://localhost:9200 surveyqq_enriched \\
+        --parquet surveyqq.parquet
+"""
+
+import argparse
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas
+
+from elasticsearch import Elasticsearch as ES, RequestsHttpConnection, helpers
+
+
+EXPORT_FIELDS = ['uuid', 'grimoire_creation_date', 'project', 'user_login',
+                 'survey_score', 'survey_answer_role', 'issue_link', 'issue_state',
+                 'issue_created_at', 'issue_time_open_days', 'issue_time_to_first_attention',
+                 'issue_labels', 'issue_milestone']
+DATE_FIELDS = ['grimoire_creation_date', 'issue_created_at']
+
+# Fields correlated with the survey score
+TIME_FIELDS = ['issue_time_to_first_attention', 'issue_time_open_days']
+
+# NPS categories, as upper limits of their scores
+NPS_BINS = [-1, 6, 8, 10]
+NPS_CATEGORIES = ['detractors', 'passives', 'promoters']
+
+SCROLL_SLICES = 4
+SCROLL_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def _read_slice(es, index, fields, slice_id, slices):
+    query = {
+        "_source": fields,
+        "query": {"exists": {"field": "survey_score"}}
+    }
+    if slices > 1:
+        query["slice"] = {"id": slice_id, "max": slices}
+
+    columns = {field: [] for field in fields}
+    for hit in helpers.scan(es, query=query, index=index, size=SCROLL_SIZE):
+        source = hit['_source']
+        for field in fields:
+            columns[field].append(source.get(field))
+
+    return columns
+
+
+def read_enriched(es, index, fields=None, slices=SCROLL_SLICES):
+    """Read the enriched survey answers into a DataFrame.
+
+    The index is read with `slices` scrolls in parallel. Only the
+    answers with a score, so not the checkpoint items of the studies,
+    are read.
+
+    :param es: Elasticsearch client
+    :param index: enriched index to read
+    :param fields: fields to read, by default `EXPORT_FIELDS`
+    :param slices: number of parallel scroll slices
+    :returns: a DataFrame with a row per answer and a column per field
+    """
+    fields = fields or EXPORT_FIELDS
+
+    with ThreadPoolExecutor(max_workers=slices) as executor:
+        parts = list(executor.map(lambda slice_id: _read_slice(es, index, fields, slice_id, slices),
+                                  range(slices)))
+
+    columns = {field: [value for part in parts for value in part[field]] for field in fields}
+    df = pandas.DataFrame(columns, columns=fields)
+
+    for field in DATE_FIELDS:
+        if field in df:
+            df[field] = pandas.to_datetime(df[field], utc=True)
+    if 'survey_score' in df:
+        df['survey_score'] = pandas.to_numeric(df['survey_score'])
+        df['nps_category'] = pandas.cut(df['survey_score'], bins=NPS_BINS, labels=NPS_CATEGORIES)
+
+    logger.debug("[surveyqq] {} answers read from {}".format(len(df), index))
+
+    return df
+
+
+def get_nps(scores):
+    """Net Promoter Score of a series of survey scores, or None if it is empty"""
+
+    if scores.empty:
+        return None
+
+    promoters = (scores >= 9).sum()
+    detractors = (scores <= 6).sum()
+    return 100.0 * (promoters - detractors) / len(scores)
+
+
+def get_score_distribution(df):
+    """Number and ratio of answers for each score.
+
+    :returns: a DataFrame indexed by score
+    """
+    counts = df['survey_score'].value_counts().sort_index()
+    return pandas.DataFrame({'answers': counts, 'ratio': counts / counts.sum()})
+
+
+def get_role_satisfaction(df):
+    """Satisfaction of the respondents by their role in the issue.
+
+    Answers of respondents without a role in their issue are
+    grouped under `none`.
+
+    :returns: a DataFrame indexed by role, with the number of answers,
+        the mean score and the NPS
+    """
+    roles = df['survey_answer_role'].fillna('none')
+    grouped = df['survey_score'].groupby(roles)
+
+    return pandas.DataFrame({
+        'answers': grouped.count(),
+        'mean_score': grouped.mean(),
+        'nps': grouped.apply(get_nps)
+    })
+
+
+def get_time_correlations(df, method='spearman'):
+    """Correlation of the survey score with the issue times.
+
+    :param method: correlation method accepted by `DataFrame.corr`
+    :returns: a Series indexed by time field
+    """
+    fields = [field for field in TIME_FIELDS if field in df]
+    corr = df[fields + ['survey_score']].astype(float).corr(method=method)
+
+    return corr['survey_score'].drop('survey_score')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and report the enriched survey answers")
+    parser.add_argument('url', help="Elasticsearch URL")
+    parser.add_argument('index', help="enriched index")
+    parser.add_argument('--slices', type=int, default=SCROLL_SLICES, help="parallel scroll slices")
+    parser.add_argument('--parquet', help="Parquet file to store the answers")
+    parser.add_argument('--no-verify-certs', dest='verify_certs', action='store_false',
+                        help="do not verify the Elasticsearch certificates")
+    args = parser.parse_args()
+
+    es = ES([args.url], retry_on_timeout=True, timeout=100,
+            verify_certs=args.verify_certs, connection_class=RequestsHttpConnection)
+    df = read_enriched(es, args.index, slices=args.slices)
+
+    if args.parquet:
+        # Labels are lists, which Parquet stores as a nested column
+        df.to_parquet(args.parquet, index=False)
+
+    print("Answers: {}  NPS: {}".format(len(df), get_nps(df['survey_score'])))
+    print("\nScore distribution\n{}".format(get_score_distribution(df)))
+    print("\nSatisfaction by role\n{}".format(get_role_satisfaction(df)))
+    print("\nScore correlation with issue times\n{}".format(get_time_correlations(df)))
+
+
+if __name__ == '__main__':
+    main()
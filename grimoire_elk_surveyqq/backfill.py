@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+"""Sharded and resumable enrichment of a whole surveyqq raw index.
+
+The raw index is split into shards by the month of the answers, which
+are enriched by a pool of processes. Finished shards are recorded in a
+JSON state file, so an interrupted backfill resumes with the shards not
+finished yet. Shards can also be spread across hosts, each one running
+a part of them with its own state file:
+
+    python -m grimoire_elk_surveyqq.backfill http://localhost:9200 surveyqq_raw surveyqq_enriched \\
+        --processes 4 --state backfill.json --host-index 0 --host-count 2
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dateutil.relativedelta import relativedelta
+from elasticsearch import Elasticsearch as ES, RequestsHttpConnection, helpers
+from grimoirelab_toolkit.datetime import datetime_utcnow, str_to_datetime
+
+from grimoire_elk.elastic import ElasticSearch
+from grimoire_elk.errors import ELKError
+
+from .enriched.surveyqq import SurveyqqEnrich
+
+
+SHARD_FIELD = 'metadata__updated_on'
+
+# Length of each kind of shard
+SHARD_INTERVALS = {
+    'year': relativedelta(years=1),
+    'quarter': relativedelta(months=3),
+    'month': relativedelta(months=1),
+    'week': relativedelta(weeks=1),
+    'day': relativedelta(days=1)
+}
+
+logger = logging.getLogger(__name__)
+
+# Enricher and raw index client used by each worker process
+_enricher = None
+_raw_es = None
+_raw_index = None
+
+
+class ShardOcean:
+    """Ocean backend reading the raw items of a shard.
+
+    :param es: Elasticsearch client
+    :param index: raw index
+    :param shard: (start, end) tuple of ISO dates of the shard
+    """
+    def __init__(self, es, index, shard):
+        self.es = es
+        self.index = index
+        self.shard = shard
+
+    def fetch(self):
+        start, end = self.shard
+        query = {
+            "query": {
+                "range": {SHARD_FIELD: {"gte": start, "lt": end}}
+            }
+        }
+        for hit in helpers.scan(self.es, query=query, index=self.index):
+            yield hit['_source']
+
+
+def get_shards(es, index, interval='month'):
+    """Split a raw index into shards with the items updated in each interval.
+
+    :param es: Elasticsearch client
+    :param index: raw index
+    :param interval: length of the shards, one of `SHARD_INTERVALS`
+    :returns: sorted list of (start, end) tuples of ISO dates
+    """
+    body = {
+        "size": 0,
+        "aggs": {
+            "shards": {
+                "date_histogram": {
+                    "field": SHARD_FIELD,
+                    "interval": interval,
+                    "min_doc_count": 1
+                }
+            }
+        }
+    }
+    response = es.search(index=index, body=body)
+
+    shards = []
+    for bucket in response['aggregations']['shards']['buckets']:
+        start = str_to_datetime(bucket['key_as_string'])
+        shards.append((start.isoformat(), (start + SHARD_INTERVALS[interval]).isoformat()))
+
+    return shards
+
+
+def read_state(path):
+    """Read the finished shards from a state file, or an empty state if it does not exist"""
+
+    if not path or not os.path.exists(path):
+        return {'shards': {}}
+
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def write_state(path, state):
+    """Write a state file, replacing it atomically"""
+
+    if not path:
+        return
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fd:
+        json.dump(state, fd, indent=4, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def get_shard_key(shard):
+    """Get the key of a shard in the state file"""
+
+    return "{}/{}".format(*shard)
+
+
+def _init_worker(url, raw_index, enriched_index, enrich_params):
+    global _enricher, _raw_es, _raw_index
+
+    _enricher = SurveyqqEnrich(**enrich_params)
+    _enricher.set_elastic(ElasticSearch(url, enriched_index, mappings=SurveyqqEnrich.mapping))
+    _raw_es = ES([url], retry_on_timeout=True, timeout=100, connection_class=RequestsHttpConnection)
+    _raw_index = raw_index
+
+
+def _enrich_shard(shard):
+    return _enricher.enrich_items(ShardOcean(_raw_es, _raw_index, shard))
+
+
+def backfill(url, raw_index, enriched_index, state_path=None, processes=1,
+             interval='month', host_index=0, host_count=1, enrich_params=None):
+    """Enrich a raw index shard by shard, skipping the shards already finished.
+
+    :param url: Elasticsearch URL
+    :param raw_index: raw index to read
+    :param enriched_index: enriched index to write
+    :param state_path: JSON file where the finished shards are recorded
+    :param processes: number of shards enriched at a time
+    :param interval: length of the shards, one of `SHARD_INTERVALS`
+    :param host_index: index of this host, from 0 to `host_count` - 1
+    :param host_count: number of hosts sharing the backfill
+    :param enrich_params: dict of parameters of `SurveyqqEnrich`, such as
+        the SortingHat database or the projects map
+    :returns: number of enriched items written
+    :raises ELKError: when any shard failed; the other shards are
+        still enriched and recorded, so running the backfill again
+        only retries the failed ones
+    """
+    es = ES([url], retry_on_timeout=True, timeout=100, connection_class=RequestsHttpConnection)
+
+    shards = get_shards(es, raw_index, interval)[host_index::host_count]
+    state = read_state(state_path)
+    target = {'raw_index': raw_index, 'enriched_index': enriched_index, 'interval': interval}
+    if any(state.get(field, value) != value for field, value in target.items()):
+        logger.warning("[surveyqq] backfill state {} is from a different backfill, starting again".format(state_path))
+        state = {'shards': {}}
+    state.update(target)
+    pending = [shard for shard in shards if get_shard_key(shard) not in state['shards']]
+
+    logger.info("[surveyqq] backfill {} shards, {} already finished".format(
+                len(shards), len(shards) - len(pending)))
+
+    # Create the enriched index before the workers use it
+    ElasticSearch(url, enriched_index, mappings=SurveyqqEnrich.mapping)
+
+    total = 0
+    failed = []
+    with ProcessPoolExecutor(max_workers=processes,
+                             initializer=_init_worker,
+                             initargs=(url, raw_index, enriched_index, enrich_params or {})) as executor:
+        futures = {executor.submit(_enrich_shard, shard): shard for shard in pending}
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                items = future.result()
+            except Exception as ex:
+                failed.append(get_shard_key(shard))
+                logger.error("[surveyqq] backfill shard {} failed: {}".format(get_shard_key(shard), ex),
+                             exc_info=ex)
+                continue
+            total += items
+
+            state['shards'][get_shard_key(shard)] = {
+                'items': items,
+                'finished_on': datetime_utcnow().isoformat()
+            }
+            write_state(state_path, state)
+            logger.info("[surveyqq] backfill shard {} finished, {} items".format(get_shard_key(shard), items))
+
+    if failed:
+        raise ELKError(cause="{} backfill shards failed: {}".format(len(failed), ", ".join(sorted(failed))))
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enrich a surveyqq raw index by shards")
+    parser.add_argument('url', help="Elasticsearch URL")
+    parser.add_argument('raw_index', help="raw index")
+    parser.add_argument('enriched_index', help="enriched index")
+    parser.add_argument('--state', help="JSON file with the finished shards")
+    parser.add_argument('--processes', type=int, default=1, help="shards enriched at a time")
+    parser.add_argument('--interval', choices=list(SHARD_INTERVALS), default='month', help="length of the shards")
+    parser.add_argument('--host-index', type=int, default=0, help="index of this host")
+    parser.add_argument('--host-count', type=int, default=1, help="number of hosts")
+    parser.add_argument('--db-sortinghat', help="SortingHat database")
+    parser.add_argument('--db-user', default='', help="SortingHat database user")
+    parser.add_argument('--db-password', default='', help="SortingHat database password")
+    parser.add_argument('--db-host', default='', help="SortingHat database host")
+    parser.add_argument('--json-projects-map', help="projects.json file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    enrich_params = {
+        'db_sortinghat': args.db_sortinghat,
+        'json_projects_map': args.json_projects_map,
+        'db_user': args.db_user,
+        'db_password': args.db_password,
+        'db_host': args.db_host
+    }
+    try:
+        total = backfill(args.url, args.raw_index, args.enriched_index, args.state, args.processes,
+                         args.interval, args.host_index, args.host_count, enrich_params)
+    except ELKError as ex:
+        logger.error("[surveyqq] backfill end with errors, {}".format(ex))
+        sys.exit(1)
+
+    logger.info("[surveyqq] backfill end, {} items enriched".format(total))
+
+
+if __name__ == '__main__':
+    main()
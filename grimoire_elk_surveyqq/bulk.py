@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import inspect
+import json
+import logging
+import random
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+
+MAX_BULK_BYTES = 8 * 1024 * 1024
+MIN_BULK_BYTES = 512 * 1024
+
+BULK_CONCURRENCY = 4
+# Bulk requests slower than this, in seconds, make the batches smaller
+BULK_TARGET_LATENCY = 2.0
+BULK_MAX_RETRIES = 6
+BULK_HEADERS = {"Content-Type": "application/x-ndjson"}
+
+# Retries of connection and read errors and of unavailable nodes, as in
+# the sessions of `grimoire_elk.enriched.utils.grimoire_con`; rejected
+# documents (429) are retried by the buffer itself
+RETRIES = 21
+RETRIES_ON_CONNECT = 21
+RETRIES_ON_READ = 8
+RETRIES_BACKOFF_FACTOR = 0.2
+RETRIES_STATUS_FORCE_LIST = [502, 503, 504]
+
+logger = logging.getLogger(__name__)
+
+
+class BulkBuffer:
+    """Bulk actions buffered until they reach a size in bytes.
+
+    The buffer is uploaded when the encoded actions reach `max_bytes` or
+    when it holds `max_items` documents, whatever happens first, so
+    the memory used by pending documents is bounded.
+
+    :param elastic: `ElasticSearch` object of the target index
+    :param max_bytes: size of the buffered actions that triggers an upload
+
+    :attr max_items: number of documents that triggers an upload, the
+        `max_items_bulk` of `elastic`; None to only limit the bytes
+    """
+    def __init__(self, elastic, max_bytes=MAX_BULK_BYTES):
+        self.elastic = elastic
+        self.url = elastic.get_bulk_url()
+        self.max_bytes = max_bytes
+        self.max_items = elastic.max_items_bulk
+
+        self.actions = []
+        self.size = 0
+        self.total = 0
+        self.inserted = 0
+
+    def add(self, _id, doc):
+        """Add an index action for a document, uploading the buffer if it is full.
+
+        :param _id: id of the document in the index
+        :param doc: document to index
+        """
+        action = '{"index" : {"_id" : "%s" } }\n' % _id
+        action += json.dumps(doc) + "\n"
+        action = action.encode('utf-8')
+
+        self.actions.append(action)
+        self.size += len(action)
+
+        if self.size >= self.max_bytes or (self.max_items and len(self.actions) >= self.max_items):
+            self.flush()
+
+    def flush(self):
+        """Upload the buffered actions.
+
+        :returns: number of documents inserted
+        """
+        if not self.actions:
+            return 0
+
+        inserted = self.elastic.safe_put_bulk(self.url, b"".join(self.actions))
+        logger.debug("[surveyqq] Bulk of {} items ({} bytes) uploaded".format(len(self.actions), self.size))
+
+        self.total += len(self.actions)
+        self.inserted += inserted
+        self.actions = []
+        self.size = 0
+
+        return inserted
+
+
+class ConcurrentBulkBuffer(BulkBuffer):
+    """Bulk buffer uploading several bulk requests at a time.
+
+    Full buffers are sent by a pool of `concurrency` threads sharing a
+    pool of keep-alive connections, while new actions are buffered. The
+    size of the batches adapts to the cluster: it shrinks when requests
+    are slower than `target_latency` or documents are rejected with a
+    429 status, and grows back, up to `max_bytes`, while requests are
+    fast. Rejected documents are sent again after a backoff.
+
+    `flush` only submits the buffer; `close` waits for all the requests
+    and `inserted` is final after it.
+
+    :param elastic: `ElasticSearch` object of the target index
+    :param concurrency: number of bulk requests in flight
+    :param max_bytes: largest size of a batch
+    :param min_bytes: smallest size of a batch
+    :param target_latency: seconds a bulk request is expected to take
+    """
+    def __init__(self, elastic, concurrency=BULK_CONCURRENCY, max_bytes=MAX_BULK_BYTES,
+                 min_bytes=MIN_BULK_BYTES, target_latency=BULK_TARGET_LATENCY):
+        super().__init__(elastic, max_bytes)
+        self.min_bytes = min_bytes
+        self.max_batch_bytes = max_bytes
+        self.target_latency = target_latency
+        self.concurrency = concurrency
+        # Batches are sized in bytes only; with `max_items_bulk` small
+        # documents would never let them grow up to `max_bytes`
+        self.max_items = None
+
+        self.session = requests.Session()
+        self.session.verify = elastic.requests.verify
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=get_retries())
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def flush(self):
+        """Submit the buffered actions, waiting if `concurrency` requests are in flight.
+
+        :returns: 0, as the documents inserted are only known after `close`
+        """
+        if not self.actions:
+            return 0
+
+        while len(self.pending) >= self.concurrency:
+            done, self.pending = wait(self.pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+
+        self.pending.add(self.executor.submit(self.__send, self.actions))
+        self.actions = []
+        self.size = 0
+
+        return 0
+
+    def close(self):
+        """Upload the remaining actions, wait for all the requests and refresh the index.
+
+        The thread pool and the session are released even when a request
+        failed; the first error is raised after all the requests finished.
+
+        :returns: number of documents inserted
+        """
+        error = None
+        try:
+            try:
+                self.flush()
+            except Exception as ex:
+                error = ex
+            for future in self.pending:
+                try:
+                    future.result()
+                except Exception as ex:
+                    error = error or ex
+            self.pending = set()
+
+            if error:
+                raise error
+
+            # Bulk requests are not refreshed, so the documents are
+            # visible to the studies once the index is refreshed
+            response = self.session.post(self.elastic.index_url + '/_refresh')
+            response.raise_for_status()
+        finally:
+            self.executor.shutdown()
+            self.session.close()
+
+        return self.inserted
+
+    def __send(self, actions):
+        total = len(actions)
+        inserted = 0
+
+        for retry in range(BULK_MAX_RETRIES + 1):
+            start = time.perf_counter()
+            response = self.session.post(self.url, data=b"".join(actions), headers=BULK_HEADERS)
+            latency = time.perf_counter() - start
+
+            if response.status_code == 429:
+                rejected = actions
+            else:
+                response.raise_for_status()
+                rejected = []
+                for action, result in zip(actions, response.json()['items']):
+                    result = next(iter(result.values()))
+                    if result.get('status') == 429:
+                        rejected.append(action)
+                    elif 'error' in result:
+                        logger.warning("[surveyqq] Failed to insert data to ES: {}".format(result['error']))
+                    else:
+                        inserted += 1
+
+            self.__adapt(latency, bool(rejected))
+            if not rejected:
+                break
+
+            logger.debug("[surveyqq] {} documents rejected, retry {}".format(len(rejected), retry + 1))
+            actions = rejected
+            time.sleep(min(30, 2 ** retry) * random.uniform(0.5, 1.0))
+        else:
+            logger.warning("[surveyqq] {} documents rejected after {} retries".format(
+                           len(actions), BULK_MAX_RETRIES))
+
+        with self.lock:
+            self.total += total
+            self.inserted += inserted
+
+        return inserted
+
+    def __adapt(self, latency, rejected):
+        with self.lock:
+            if rejected or latency > self.target_latency:
+                self.max_bytes = max(self.min_bytes, int(self.max_bytes * 0.5 if rejected else self.max_bytes * 0.75))
+            elif latency < self.target_latency / 2:
+                self.max_bytes = min(self.max_batch_bytes, int(self.max_bytes * 1.25))
+
+
+def get_retries(retry_class=Retry):
+    """Get the retries of the bulk requests, see `RETRIES`.
+
+    Bulk requests are POST requests, which urllib3 does not retry by
+    default. The argument allowing every method is `method_whitelist`
+    up to urllib3 1.25, the version pinned by the package, and
+    `allowed_methods` in newer versions.
+
+    :param retry_class: `Retry` class of urllib3
+    """
+    if 'allowed_methods' in inspect.signature(retry_class.__init__).parameters:
+        methods = {'allowed_methods': False}
+    else:
+        methods = {'method_whitelist': False}
+
+    return retry_class(total=RETRIES, connect=RETRIES_ON_CONNECT, read=RETRIES_ON_READ,
+                       backoff_factor=RETRIES_BACKOFF_FACTOR, status_forcelist=RETRIES_STATUS_FORCE_LIST,
+                       raise_on_status=False, **methods)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+"""Options of the surveyqq backends read from the environment.
+
+grimoire_elk and Mordred build the raw and enriched backends of a data
+source without any parameter specific to the plugin, so the options of
+the surveyqq backends are read from environment variables named
+`SURVEYQQ_<OPTION>`, e.g. `SURVEYQQ_WORKERS=8`. Empty or missing
+variables keep the default of the option.
+"""
+
+import os
+
+
+ENV_PREFIX = 'SURVEYQQ_'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+def get_option(name, environ=None):
+    """Get the value of an option, or None if it is not set.
+
+    :param name: name of the option, e.g. `workers`
+    :param environ: dict of environment variables; `os.environ` by default
+    """
+    environ = os.environ if environ is None else environ
+    value = environ.get(ENV_PREFIX + name.upper(), '').strip()
+
+    return value or None
+
+
+def get_int_option(name, environ=None):
+    """Get the value of an integer option, or None if it is not set"""
+
+    value = get_option(name, environ)
+    if value is None:
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("{}{} must be an integer, not {}".format(ENV_PREFIX, name.upper(), value))
+
+
+def get_bool_option(name, environ=None):
+    """Get the value of a boolean option, or None if it is not set"""
+
+    value = get_option(name, environ)
+    if value is None:
+        return None
+
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValueError("{}{} must be a boolean, not {}".format(ENV_PREFIX, name.upper(), value))
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import logging
+
+from elasticsearch import helpers
+
+from .dates import diff_days, str_to_epoch
+
+
+# States of the issues which are still open
+OPEN_STATES = ['open', 'progressing']
+
+logger = logging.getLogger(__name__)
+
+
+def is_open(issue):
+    """Check whether an issue is still open"""
+
+    return issue['state'] in OPEN_STATES
+
+
+def get_open_issues(es, index):
+    """Get the enriched items of the answers about open issues.
+
+    :param es: Elasticsearch client
+    :param index: enriched index to read
+    :returns: generator of (id, issue creation date, current age) tuples
+    """
+    query = {
+        "_source": ['issue_created_at', 'issue_time_open_days'],
+        "query": {
+            "terms": {"issue_state": OPEN_STATES}
+        }
+    }
+    for hit in helpers.scan(es, query=query, index=index):
+        eitem = hit['_source']
+        yield hit['_id'], eitem.get('issue_created_at'), eitem.get('issue_time_open_days')
+
+
+def refresh_open_days(es, index, es_major, now, chunk_size=1000):
+    """Update the age of the open issues with partial updates.
+
+    Only `issue_time_open_days` is written, and only for the items
+    whose value changed, so the rest of the enriched items is kept.
+
+    :param es: Elasticsearch client
+    :param index: enriched index to update
+    :param es_major: major version of Elasticsearch, as string
+    :param now: POSIX timestamp used as reference date
+    :param chunk_size: number of updates sent in each bulk request
+    :returns: tuple with the number of open items read and updated
+    """
+    doc_type = 'item' if es_major != '7' else '_doc'
+    counts = {'read': 0}
+
+    def get_updates():
+        for _id, created_at, open_days in get_open_issues(es, index):
+            counts['read'] += 1
+            new_open_days = diff_days(str_to_epoch(created_at), now)
+            if new_open_days == open_days:
+                continue
+            yield {
+                '_op_type': 'update',
+                '_index': index,
+                '_type': doc_type,
+                '_id': _id,
+                'doc': {'issue_time_open_days': new_open_days}
+            }
+
+    updated, _ = helpers.bulk(es, get_updates(), chunk_size=chunk_size)
+
+    return counts['read'], updated
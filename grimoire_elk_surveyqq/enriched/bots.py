@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import json
+import re
+
+
+# Users whose name ends with one of these suffixes are bots by default
+BOT_SUFFIXES = ['-bot']
+
+
+class BotDetector:
+    """Classifier of Gitee users into bots and people.
+
+    A user is a bot when its login or name is one of `logins`, ends
+    with one of `suffixes` or matches one of `patterns`. Each pattern is
+    compiled once, on its own, so patterns can carry inline flags such
+    as `(?i)`, and the verdict for each user is cached, so each user is
+    classified once.
+
+    :param logins: list of logins and names of bots
+    :param suffixes: list of suffixes of bot logins and names
+    :param patterns: list of regular expressions matching bot logins and names
+
+    :raises ValueError: when a pattern is not a valid regular expression
+    """
+    def __init__(self, logins=None, suffixes=None, patterns=None):
+        self.logins = frozenset(logins or [])
+        self.suffixes = tuple(BOT_SUFFIXES if suffixes is None else suffixes)
+        self.patterns = tuple(patterns or [])
+        self.matchers = [self.__compile(pattern) for pattern in self.patterns]
+        self.verdicts = {}
+
+    @classmethod
+    def from_file(cls, path):
+        """Build a detector from a JSON file with `logins`, `suffixes` and `patterns` lists"""
+
+        with open(path) as fd:
+            config = json.load(fd)
+
+        return cls(logins=config.get('logins'), suffixes=config.get('suffixes'),
+                   patterns=config.get('patterns'))
+
+    def is_bot(self, user):
+        """Check whether a user is a bot.
+
+        Anonymized users, whose names are hashed, carry the verdict
+        given before hashing them in `bot`.
+
+        :param user: user dict, with `login` and optionally `name` and `bot`
+        """
+        if 'bot' in user:
+            return user['bot']
+
+        key = (user.get('login'), user.get('name'))
+        verdict = self.verdicts.get(key)
+        if verdict is None:
+            verdict = any(self.__is_bot_name(name) for name in key if name)
+            self.verdicts[key] = verdict
+        return verdict
+
+    def __is_bot_name(self, name):
+        if name in self.logins or name.endswith(self.suffixes):
+            return True
+        return any(matcher.search(name) for matcher in self.matchers)
+
+    @staticmethod
+    def __compile(pattern):
+        try:
+            return re.compile(pattern)
+        except re.error as ex:
+            raise ValueError("Invalid bot pattern {}: {}".format(pattern, ex))
+
+    def __getstate__(self):
+        # Verdicts are not sent to the worker processes
+        state = self.__dict__.copy()
+        state['verdicts'] = {}
+        return state
+
+
+DEFAULT_BOTS = BotDetector()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import statistics
+
+from .bots import DEFAULT_BOTS
+from .dates import epoch_to_datetime, str_to_epoch
+
+
+class CommentIndex:
+    """Index of the comments of an issue, built in a single pass.
+
+    :param issue: issue data, as in `issue_data` of a raw item
+    :param comments: comments of the issue, as in `comment_data`
+    :param bots: `BotDetector` telling which commenters are bots
+
+    :attr logins: set with the logins of the commenters
+    :attr timestamps: creation dates of the comments, as POSIX timestamps
+        and in the same order as `comments`
+    :attr first_attention_ts: timestamp of the first comment made by
+        someone other than the issue author and bots, or None
+    :attr first_bot_ts: timestamp of the first comment made by a bot, or None
+    :attr responders: set with the logins of the commenters other than
+        the issue author and bots
+    """
+    def __init__(self, issue, comments, bots=DEFAULT_BOTS):
+        author = issue['user']['login']
+
+        self.logins = set()
+        self.timestamps = []
+        self.first_attention_ts = None
+        self.first_bot_ts = None
+        self.responders = set()
+
+        for comment in comments:
+            user = comment['user']
+            created_at = str_to_epoch(comment['created_at'])
+
+            self.logins.add(user['login'])
+            self.timestamps.append(created_at)
+
+            if bots.is_bot(user):
+                if self.first_bot_ts is None or created_at < self.first_bot_ts:
+                    self.first_bot_ts = created_at
+                continue
+            if user['login'] == author:
+                continue
+
+            self.responders.add(user['login'])
+            if self.first_attention_ts is None or created_at < self.first_attention_ts:
+                self.first_attention_ts = created_at
+
+    @property
+    def first_attention(self):
+        """Date of the first comment made by someone other than the
+        issue author and bots, or None"""
+
+        if self.first_attention_ts is None:
+            return None
+        return epoch_to_datetime(self.first_attention_ts)
+
+    def get_median_gap(self, start):
+        """Median time, in seconds, between consecutive comments.
+
+        :param start: timestamp the first gap is counted from, usually
+            the creation of the issue
+        :returns: the median gap, or None if there are no comments
+        """
+        if not self.timestamps:
+            return None
+
+        timestamps = [start] + sorted(self.timestamps)
+        return statistics.median(end - begin for begin, end in zip(timestamps, timestamps[1:]))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import datetime
+
+from functools import lru_cache
+
+from grimoirelab_toolkit.datetime import str_to_datetime
+
+
+DATES_CACHE_SIZE = 65536
+SECONDS_DAY = float(60 * 60 * 24)
+
+
+def parse_date(value):
+    """Parse a date string into a timezone aware datetime.
+
+    Gitee dates (e.g. `2021-03-01T10:20:30+08:00`) are ISO 8601 strings
+    parsed with `datetime.fromisoformat`; other formats fall back to
+    the general parser of grimoirelab-toolkit. Dates without timezone
+    are considered UTC.
+
+    :param value: date string
+    :returns: a timezone aware datetime
+    """
+    try:
+        date = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        date = str_to_datetime(value)
+
+    if not date.tzinfo:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+
+    return date
+
+
+@lru_cache(maxsize=DATES_CACHE_SIZE)
+def str_to_epoch(value):
+    """Get the POSIX timestamp of a date string, or None if there is no date.
+
+    Results are memoized, so dates shared by several answers, like the
+    creation date of an issue, are parsed once.
+    """
+    if value is None:
+        return None
+
+    return parse_date(value).timestamp()
+
+
+def datetime_to_epoch(date):
+    """Get the POSIX timestamp of a datetime; naive datetimes are considered UTC"""
+
+    if not date.tzinfo:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+
+    return date.timestamp()
+
+
+def epoch_to_datetime(timestamp):
+    """Get the UTC datetime of a POSIX timestamp"""
+
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def diff_days(start, end):
+    """Number of days between two POSIX timestamps, rounded to two decimals.
+
+    :returns: the number of days, or None when any of the dates is missing
+    """
+    if start is None or end is None:
+        return None
+
+    return float('%.2f' % ((end - start) / SECONDS_DAY))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import hashlib
+import json
+
+
+# Changes whenever the fields computed by the enricher change, so
+# answers enriched by a previous version are enriched again
+FINGERPRINT_VERSION = 1
+
+FINGERPRINT_FIELD = 'fingerprint'
+
+
+def get_config_fingerprint(config):
+    """Get a fingerprint of the configuration of the enricher.
+
+    :param config: JSON serializable object with the settings the rich
+        items depend on, such as the projects map or the bots
+    :returns: hex digest
+    """
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_fingerprint(item, config_fingerprint=None, identity=None):
+    """Get a fingerprint of the data of a raw item read by the enricher.
+
+    The fingerprint covers the questions of the answer, the date the
+    issue was updated, the number of its comments, the identity of the
+    respondent and the configuration of the enricher, so answers are
+    enriched again when any of them changes.
+
+    :param item: raw item
+    :param config_fingerprint: fingerprint of the configuration of the
+        enricher, see `get_config_fingerprint`
+    :param identity: JSON serializable identity of the respondent, such
+        as its SortingHat id and uuid
+    :returns: hex digest
+    """
+    data = item['data']
+    issue = data.get('issue_data')
+    updated_at = issue.get('updated_at') if isinstance(issue, dict) else issue
+    comments = len(data.get('comment_data') or [])
+
+    content = [FINGERPRINT_VERSION, config_fingerprint, identity, data.get('started_at'), updated_at, comments,
+               [answer.get('questions') for answer in data.get('answer', [])]]
+
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_fingerprints(es, index, ids):
+    """Get the fingerprints stored in the enriched items with some ids.
+
+    :param es: Elasticsearch client
+    :param index: enriched index
+    :param ids: list of ids of the enriched items
+    :returns: dict mapping ids to fingerprints
+    """
+    body = {
+        "size": len(ids),
+        "_source": [FINGERPRINT_FIELD],
+        "query": {
+            "ids": {"values": ids}
+        }
+    }
+    response = es.search(index=index, body=body)
+
+    return {hit['_id']: hit['_source'].get(FINGERPRINT_FIELD) for hit in response['hits']['hits']}
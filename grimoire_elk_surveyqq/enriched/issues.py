@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+from collections import OrderedDict
+
+
+ISSUE_CACHE_SIZE = 1024
+
+
+class IssueMetricsCache:
+    """Bounded LRU cache of the metrics derived from Gitee issues.
+
+    Several survey answers usually point to the same issue. Entries are
+    keyed by the issue URL and its `updated_at` date, so any change in
+    the issue invalidates its previous metrics.
+
+    :param size: maximum number of issues kept in the cache
+    """
+    def __init__(self, size=ISSUE_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.__metrics = OrderedDict()
+
+    def __len__(self):
+        return len(self.__metrics)
+
+    @staticmethod
+    def get_key(issue):
+        """Get the cache key of an issue, or None if it cannot be identified"""
+
+        issue_id = issue.get('html_url') or issue.get('url') or issue.get('id')
+        if issue_id is None:
+            return None
+
+        return issue_id, issue.get('updated_at')
+
+    def get(self, issue, compute):
+        """Get the metrics of an issue, computing them on a cache miss.
+
+        :param issue: issue data, as in `issue_data` of a raw item
+        :param compute: callable returning the metrics of the issue
+        :returns: the metrics of the issue
+        """
+        key = self.get_key(issue)
+        if key is None:
+            self.misses += 1
+            return compute()
+
+        if key in self.__metrics:
+            self.hits += 1
+            self.__metrics.move_to_end(key)
+            return self.__metrics[key]
+
+        self.misses += 1
+        metrics = compute()
+        self.__metrics[key] = metrics
+        if len(self.__metrics) > self.size:
+            self.__metrics.popitem(last=False)
+
+        return metrics
+
+    def clear(self):
+        """Remove all the entries and reset the counters"""
+
+        self.__metrics.clear()
+        self.hits = 0
+        self.misses = 0
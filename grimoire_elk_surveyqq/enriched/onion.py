@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import logging
+
+from elasticsearch.exceptions import NotFoundError
+from grimoirelab_toolkit.datetime import str_to_datetime
+
+from grimoire_elk.enriched.study_ceres_onion import ESOnionConnector
+
+
+ONION_CHECKPOINT_ID = 'surveyqq_onion_checkpoint'
+
+logger = logging.getLogger(__name__)
+
+
+class SurveyqqOnionConnector(ESOnionConnector):
+    """Onion connector which only reads a given set of quarters.
+
+    :param quarters: quarters to read, as strings like `2021Q1`;
+        if None, all the quarters are read
+    """
+    def __init__(self, es_conn, es_index, contribs_field,
+                 timeframe_field='grimoire_creation_date',
+                 sort_on_field='metadata__timestamp', read_only=True,
+                 quarters=None):
+
+        super().__init__(es_conn=es_conn, es_index=es_index,
+                         contribs_field=contribs_field,
+                         timeframe_field=timeframe_field,
+                         sort_on_field=sort_on_field,
+                         read_only=read_only)
+        self.quarters = quarters
+
+    def _ESOnionConnector__quarters(self, from_date=None):
+        quarters = super()._ESOnionConnector__quarters(from_date)
+
+        if self.quarters is None:
+            return quarters
+
+        return [quarter for quarter in quarters if str(quarter) in self.quarters]
+
+
+def get_quarter(date):
+    """Get the quarter of a date as a string like `2021Q1`"""
+
+    return "{}Q{}".format(date.year, (date.month - 1) // 3 + 1)
+
+
+def get_touched_quarters(es, index, timeframe_field, since):
+    """Get the quarters with items enriched after a given date.
+
+    :param es: Elasticsearch client
+    :param index: enriched index to read
+    :param timeframe_field: date field used to split the items in quarters
+    :param since: datetime of the last onion run
+    :returns: sorted list of quarters, as strings like `2021Q1`
+    """
+    body = {
+        "size": 0,
+        "query": {
+            "range": {
+                "metadata__enriched_on": {"gt": since.isoformat()}
+            }
+        },
+        "aggs": {
+            "quarters": {
+                "date_histogram": {
+                    "field": timeframe_field,
+                    "interval": "quarter",
+                    "min_doc_count": 1
+                }
+            }
+        }
+    }
+    response = es.search(index=index, body=body)
+
+    buckets = response['aggregations']['quarters']['buckets']
+    return sorted({get_quarter(str_to_datetime(bucket['key_as_string'])) for bucket in buckets})
+
+
+def delete_quarters(es, index, quarters):
+    """Delete the onion items of some quarters"""
+
+    body = {
+        "query": {
+            "terms": {"quarter": quarters}
+        }
+    }
+    response = es.delete_by_query(index=index, body=body, conflicts='proceed', refresh=True)
+    logger.debug("[surveyqq] study onion deleted {} items in {}".format(response['deleted'], quarters))
+
+
+def read_checkpoint(es, index, es_major):
+    """Read the onion checkpoint of an index.
+
+    :returns: date of the last onion run, or None if there is no checkpoint
+    """
+    doc_type = 'item' if es_major != '7' else '_doc'
+
+    try:
+        doc = es.get(index=index, doc_type=doc_type, id=ONION_CHECKPOINT_ID)
+    except NotFoundError:
+        return None
+
+    return str_to_datetime(doc['_source']['metadata__enriched_on'])
+
+
+def write_checkpoint(es, index, es_major, run_date, quarters=None):
+    """Store the date of an onion run and the quarters it recomputed"""
+
+    doc_type = 'item' if es_major != '7' else '_doc'
+    doc = {
+        'metadata__enriched_on': run_date.isoformat(),
+        'checkpoint_quarters': quarters
+    }
+    es.index(index=index, doc_type=doc_type, id=ONION_CHECKPOINT_ID, body=doc, refresh=True)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import logging
+
+from concurrent.futures import (FIRST_COMPLETED,
+                                ProcessPoolExecutor,
+                                as_completed,
+                                wait)
+
+
+# Blocks submitted per worker before waiting for results
+MAX_PENDING_BLOCKS = 2
+
+logger = logging.getLogger(__name__)
+
+# Enricher used by each worker process
+_enricher = None
+
+
+def _init_worker(enrich_class, layouts, bots):
+    global _enricher
+
+    _enricher = enrich_class()
+    _enricher.layouts = layouts
+    _enricher.set_bots(bots)
+
+
+def _get_rich_surveys(items, now):
+    return _enricher.get_rich_surveys(items, now)
+
+
+def get_rich_surveys(blocks, enrich_class, layouts, workers, now, bots):
+    """Compute the partial rich items of blocks of raw items in a pool of processes.
+
+    Each worker uses its own enricher, without SortingHat nor projects
+    map, so the partial rich items must be completed by the caller. At
+    most `MAX_PENDING_BLOCKS` blocks per worker are in flight at a time.
+
+    :param blocks: iterator of lists of raw items
+    :param enrich_class: enricher class instantiated in each worker
+    :param layouts: `QuestionnaireLayouts` used to read the answers
+    :param workers: number of worker processes
+    :param now: naive UTC datetime used as reference date for open issues
+    :param bots: `BotDetector` used by the workers
+    :returns: generator of (block, partial rich items) tuples, in the
+        order the blocks are finished
+    """
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(enrich_class, layouts, bots)) as executor:
+        pending = {}
+
+        for block in blocks:
+            pending[executor.submit(_get_rich_surveys, block, now)] = block
+
+            if len(pending) < workers * MAX_PENDING_BLOCKS:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+        for future in as_completed(list(pending)):
+            yield pending.pop(future), future.result()
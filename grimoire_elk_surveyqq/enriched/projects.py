@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import logging
+
+from urllib.parse import urlparse
+
+
+# Sections of the projects map checked first to find the project of a repository
+REPOSITORY_SECTIONS = ['gitee:issue', 'gitee']
+
+logger = logging.getLogger(__name__)
+
+
+def get_repository_key(url):
+    """Get the (host, owner, repository) of a Gitee repository, issue or pull request URL.
+
+    Owner and repository are the first two parts of the path, as split
+    by `SurveyqqOcean.get_perceval_params_from_url` for repository URLs.
+
+    :returns: tuple in lower case, or None if the URL has no repository
+    """
+    if not url or not isinstance(url, str):
+        return None
+
+    parsed = urlparse(url.strip())
+    parts = [part for part in parsed.path.split('/') if part]
+    if not parsed.netloc or len(parts) < 2:
+        return None
+
+    repository = parts[1][:-4] if parts[1].endswith('.git') else parts[1]
+    return parsed.netloc.lower(), parts[0].lower(), repository.lower()
+
+
+class ProjectIndex:
+    """Index of the projects of the repositories in a projects map.
+
+    The index is built once from the projects map, so the project of a
+    repository is found with a dict lookup. When a repository is in more
+    than one section, `REPOSITORY_SECTIONS` are checked first and then
+    the other sections in alphabetical order.
+
+    :param prjs_map: projects map of an enricher, as a dict of sections
+        mapping repository URLs to projects
+    """
+    def __init__(self, prjs_map):
+        self.repositories = {}
+        self.origins = {}
+
+        sections = [section for section in REPOSITORY_SECTIONS if section in prjs_map]
+        sections += sorted(section for section in prjs_map if section not in REPOSITORY_SECTIONS)
+
+        for section in sections:
+            for url, project in prjs_map[section].items():
+                key = get_repository_key(url)
+                if key and key not in self.repositories:
+                    self.repositories[key] = project
+
+        logger.debug("[surveyqq] Project index with {} repositories".format(len(self.repositories)))
+
+    def get_project(self, url):
+        """Get the project of the repository of a URL, or None if it is not in the index"""
+
+        key = get_repository_key(url)
+        if not key:
+            return None
+        return self.repositories.get(key)
+
+    def get_origin_project(self, origin, find_project):
+        """Get the project of an origin, calling `find_project` only the first time.
+
+        :param origin: origin of the items
+        :param find_project: function returning the project of the origin
+        """
+        if origin not in self.origins:
+            self.origins[origin] = find_project()
+        return self.origins[origin]
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import logging
+
+
+TEXT = 'text'
+OPTIONS = 'options'
+
+# Fields read from a questionnaire answer, in the order the questions
+# have in the reference Gitee survey
+SURVEY_FIELDS = (
+    ('user_login', TEXT),
+    ('user_email', TEXT),
+    ('issue_link', TEXT),
+    ('survey_score', TEXT),
+    ('score_reasons', OPTIONS),
+    ('participated_reason', OPTIONS),
+    ('user_appeal', OPTIONS)
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionnaireLayout:
+    """Location of the survey fields in the questions of a questionnaire.
+
+    The layout maps each field in `SURVEY_FIELDS` to the id of the question
+    holding it and to the position that question had when the layout was
+    built. Answers keeping that order are read by position; answers whose
+    questions were reordered are read by question id. Questions without
+    id, as in surveys exported without them, are always read by position.
+
+    Fields are located, in this order, by the id of their question in
+    the survey definition, by a text in the title of their question, or
+    by their position in the reference survey.
+
+    :param survey_id: id of the survey the layout belongs to
+    :param questions: questions of an answer to the survey
+    :param titles: optional dict mapping fields to a text contained in
+        the title of their question
+    :param question_ids: optional dict mapping fields to the id of
+        their question in the survey definition
+    """
+    def __init__(self, survey_id, questions, titles=None, question_ids=None):
+        self.survey_id = survey_id
+        self.extractors = []
+        self.resolved = True
+
+        titles = titles or {}
+        question_ids = question_ids or {}
+        for position, (field, kind) in enumerate(SURVEY_FIELDS):
+            if field in question_ids:
+                position = self.__find_id(questions, question_ids[field])
+            elif field in titles:
+                position = self.__find_title(questions, titles[field])
+            if position is None or position >= len(questions):
+                logger.debug("[surveyqq] Question for {} not found in survey {}".format(field, survey_id))
+                self.extractors.append((field, kind, None, None))
+                self.resolved = False
+                continue
+            self.extractors.append((field, kind, position, questions[position].get('id')))
+
+    @staticmethod
+    def __find_id(questions, question_id):
+        for position, question in enumerate(questions):
+            if question.get('id') == question_id:
+                return position
+        return None
+
+    @staticmethod
+    def __find_title(questions, title):
+        for position, question in enumerate(questions):
+            if title in (question.get('title') or ''):
+                return position
+        return None
+
+    def extract(self, questions):
+        """Read the survey fields from the questions of an answer.
+
+        :param questions: questions of an answer to the survey
+        :returns: dict with the value of each survey field; text fields
+            are strings and option fields are lists with the text of the
+            selected options
+        """
+        fields = {}
+        for field, kind, question in self.locate(questions):
+            if kind == TEXT:
+                fields[field] = question['text'] if question else None
+            else:
+                fields[field] = [op['text'] for op in question['options']] if question else []
+
+        return fields
+
+    def locate(self, questions):
+        """Find the questions holding the survey fields in an answer.
+
+        :param questions: questions of an answer to the survey
+        :returns: generator of (field, kind, question) tuples, where
+            question is None when the answer does not include it
+        """
+        by_id = None
+        for field, kind, position, question_id in self.extractors:
+            question = None
+            if position is not None:
+                if question_id is None:
+                    question = questions[position] if position < len(questions) else None
+                elif position < len(questions) and questions[position].get('id') == question_id:
+                    question = questions[position]
+                else:
+                    if by_id is None:
+                        by_id = {q.get('id'): q for q in questions}
+                    question = by_id.get(question_id)
+
+            yield field, kind, question
+
+
+class QuestionnaireLayouts:
+    """Cache of questionnaire layouts, built once per survey.
+
+    Layouts are cached by the origin of the items, which is the URL of
+    the survey; by the survey id of the answers when the origin is not
+    known; or by the set of question ids, which does not change when the
+    questions are reordered, or by their titles when they have no ids.
+    Layouts missing any field, or built from an answer where only some
+    questions have ids, are not cached, so a malformed answer does not
+    spoil the layout of its survey.
+
+    :param titles: titles used to locate the fields, see `QuestionnaireLayout`
+    :param question_ids: ids of the questions of the fields, see `QuestionnaireLayout`
+    """
+    def __init__(self, titles=None, question_ids=None):
+        self.titles = titles
+        self.question_ids = question_ids
+        self.layouts = {}
+
+    def get(self, answer, origin=None):
+        """Get the layout for the survey of an answer, building it on first use.
+
+        :param answer: answer to a survey, including its `questions`
+        :param origin: origin of the item of the answer
+        :returns: a `QuestionnaireLayout`
+        """
+        questions = answer['questions']
+        survey_id = answer.get('survey_id')
+        missing_ids = sum(q.get('id') is None for q in questions)
+        if origin is not None:
+            key = origin
+        elif survey_id is not None:
+            key = survey_id
+        elif not missing_ids:
+            key = frozenset(q['id'] for q in questions)
+        else:
+            key = tuple(q.get('title') for q in questions)
+
+        layout = self.layouts.get(key)
+        if not layout:
+            layout = QuestionnaireLayout(survey_id, questions, self.titles, self.question_ids)
+            if layout.resolved and missing_ids in (0, len(questions)):
+                self.layouts[key] = layout
+
+        return layout
+
+    def extract(self, answer, origin=None):
+        """Read the survey fields of an answer using the layout of its survey"""
+
+        return self.get(answer, origin).extract(answer['questions'])
+
+    def locate(self, answer, origin=None):
+        """Find the questions holding the survey fields of an answer, see `QuestionnaireLayout.locate`"""
+
+        return self.get(answer, origin).locate(answer['questions'])
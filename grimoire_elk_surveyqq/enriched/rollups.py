@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import logging
+
+from collections import Counter
+
+from elasticsearch import helpers
+from grimoirelab_toolkit.datetime import str_to_datetime
+
+from grimoire_elk.elastic_mapping import Mapping as BaseMapping
+
+from .dates import epoch_to_datetime, str_to_epoch
+
+
+# NPS category of the answers with reasons in each field
+SCORE_BUCKETS = {
+    'issue_unsatisfied': 'detractors',
+    'issue_to_improve': 'passives',
+    'issue_satisfied': 'promoters'
+}
+
+ROLLUP_ALL = 'all'
+ROLLUP_LABEL = 'label'
+ROLLUP_MILESTONE = 'milestone'
+
+ROLLUP_SOURCE_FIELDS = ['grimoire_creation_date', 'project', 'survey_score',
+                        'issue_labels', 'issue_milestone'] + list(SCORE_BUCKETS)
+
+logger = logging.getLogger(__name__)
+
+
+class Mapping(BaseMapping):
+
+    @staticmethod
+    def get_elastic_mappings(es_major):
+        """Get Elasticsearch mapping.
+        :param es_major: major version of Elasticsearch, as string
+        :returns:        dictionary with a key, 'items', with the mapping
+        """
+
+        mapping = """
+        {
+            "dynamic": false,
+            "properties": {
+                "uuid": {"type": "keyword"},
+                "rollup_type": {"type": "keyword"},
+                "grimoire_creation_date": {"type": "date"},
+                "project": {"type": "keyword"},
+                "dimension": {"type": "keyword"},
+                "dimension_value": {"type": "keyword"},
+                "answers": {"type": "long"},
+                "score_sum": {"type": "long"},
+                "detractors": {"type": "long"},
+                "passives": {"type": "long"},
+                "promoters": {"type": "long"},
+                "reason_field": {"type": "keyword"},
+                "reason": {"type": "keyword"},
+                "count": {"type": "long"},
+                "metadata__enriched_on": {"type": "date"}
+            }
+        }
+        """
+
+        return {"items": mapping}
+
+
+def get_utc_day(date):
+    """Get the UTC day of a date string, as `YYYY-MM-DD`, or None if there is no date.
+
+    Days of the rollups are UTC days, like the buckets of the date
+    histograms of Elasticsearch.
+    """
+    timestamp = str_to_epoch(date) if date else None
+    if timestamp is None:
+        return None
+
+    return epoch_to_datetime(timestamp).date().isoformat()
+
+
+class SurveyRollups:
+    """Daily rollups of survey answers.
+
+    Answers are counted per UTC day and project, for all the answers and for
+    each issue label and milestone. There are two kinds of rollup items:
+    `score` items with the number of answers, the sum of their scores and
+    the number of detractors, passives and promoters; and `reason` items
+    with the number of times each reason option was selected.
+    """
+    def __init__(self):
+        self.scores = {}
+        self.reasons = Counter()
+
+    def add(self, eitem):
+        """Count an enriched survey answer"""
+
+        day = get_utc_day(eitem['grimoire_creation_date'])
+        project = eitem.get('project') or ''
+
+        dimensions = [(ROLLUP_ALL, '')]
+        dimensions.extend((ROLLUP_LABEL, label) for label in eitem.get('issue_labels') or [])
+        if eitem.get('issue_milestone'):
+            dimensions.append((ROLLUP_MILESTONE, eitem['issue_milestone']))
+
+        try:
+            score = int(eitem['survey_score'])
+        except (TypeError, ValueError):
+            score = None
+
+        for dimension, value in dimensions:
+            key = (day, project, dimension, value)
+            scores = self.scores.get(key)
+            if not scores:
+                scores = Counter()
+                self.scores[key] = scores
+
+            scores['answers'] += 1
+            if score is not None:
+                scores['score_sum'] += score
+
+            for reason_field, bucket in SCORE_BUCKETS.items():
+                if reason_field not in eitem:
+                    continue
+                scores[bucket] += 1
+                for reason in eitem[reason_field] or []:
+                    self.reasons[key + (reason_field, reason)] += 1
+
+    def get_items(self, enriched_on):
+        """Generate the rollup items.
+
+        :param enriched_on: ISO date of the rollup computation
+        """
+        for (day, project, dimension, value), scores in self.scores.items():
+            yield {
+                'uuid': '_'.join(['score', day, project, dimension, value]),
+                'rollup_type': 'score',
+                'grimoire_creation_date': day,
+                'project': project,
+                'dimension': dimension,
+                'dimension_value': value,
+                'answers': scores['answers'],
+                'score_sum': scores['score_sum'],
+                'detractors': scores['detractors'],
+                'passives': scores['passives'],
+                'promoters': scores['promoters'],
+                'metadata__enriched_on': enriched_on
+            }
+
+        for (day, project, dimension, value, reason_field, reason), count in self.reasons.items():
+            yield {
+                'uuid': '_'.join(['reason', day, project, dimension, value, reason_field, reason]),
+                'rollup_type': 'reason',
+                'grimoire_creation_date': day,
+                'project': project,
+                'dimension': dimension,
+                'dimension_value': value,
+                'reason_field': reason_field,
+                'reason': reason,
+                'count': count,
+                'metadata__enriched_on': enriched_on
+            }
+
+
+def get_touched_days(es, index, since=None):
+    """Get the days with survey answers enriched after a given date.
+
+    :param es: Elasticsearch client
+    :param index: enriched index to read
+    :param since: datetime of the last rollup computation, or None
+        to get all the days
+    :returns: sorted list of days, as `YYYY-MM-DD` strings
+    """
+    body = {
+        "size": 0,
+        "aggs": {
+            "days": {
+                "date_histogram": {
+                    "field": "grimoire_creation_date",
+                    "interval": "day",
+                    "min_doc_count": 1
+                }
+            }
+        }
+    }
+    if since:
+        body["query"] = {"range": {"metadata__enriched_on": {"gt": since.isoformat()}}}
+
+    response = es.search(index=index, body=body)
+
+    buckets = response['aggregations']['days']['buckets']
+    return sorted({str_to_datetime(bucket['key_as_string']).date().isoformat() for bucket in buckets})
+
+
+def compute_rollups(es, index, days):
+    """Compute the rollups of the survey answers created in some days.
+
+    :param es: Elasticsearch client
+    :param index: enriched index to read
+    :param days: list of `YYYY-MM-DD` strings
+    :returns: a `SurveyRollups` object
+    """
+    rollups = SurveyRollups()
+    days = set(days)
+
+    query = {
+        "_source": ROLLUP_SOURCE_FIELDS,
+        "query": {
+            "range": {
+                "grimoire_creation_date": {
+                    "gte": min(days),
+                    "lte": max(days) + "T23:59:59.999"
+                }
+            }
+        }
+    }
+    for hit in helpers.scan(es, query=query, index=index):
+        eitem = hit['_source']
+        if get_utc_day(eitem.get('grimoire_creation_date')) in days:
+            rollups.add(eitem)
+
+    return rollups
+
+
+def delete_days(es, index, days):
+    """Delete the rollup items of some days"""
+
+    body = {
+        "query": {
+            "terms": {"grimoire_creation_date": days}
+        }
+    }
+    response = es.delete_by_query(index=index, body=body, conflicts='proceed', refresh=True)
+    logger.debug("[surveyqq] study rollups deleted {} items".format(response['deleted']))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+"""Generate the Elasticsearch mapping of the enriched index from its schema.
+
+The mapping shipped in `mappings/surveyqq.json` is generated with:
+
+    python -m grimoire_elk_surveyqq.enriched.schema schema/gitee_issues_survey.csv \\
+        > grimoire_elk_surveyqq/enriched/mappings/surveyqq.json
+"""
+
+import csv
+import json
+import sys
+
+
+# Elasticsearch field definition for each type in the schema
+SCHEMA_TYPES = {
+    'keyword': {"type": "keyword"},
+    'long': {"type": "long"},
+    'integer': {"type": "integer"},
+    'float': {"type": "float"},
+    'boolean': {"type": "boolean"},
+    'date': {"type": "date"},
+    'geo_point': {"type": "geo_point"}
+}
+
+
+def read_schema(schema_file):
+    """Read the fields of a schema CSV file.
+
+    :param schema_file: path of a CSV file with `name`, `type`
+        and `description` columns
+    :returns: list of (name, type) tuples
+    """
+    with open(schema_file, newline='') as fd:
+        return [(row['name'], row['type']) for row in csv.DictReader(fd)]
+
+
+def get_schema_mapping(schema_file):
+    """Build the mapping properties of the fields of a schema CSV file"""
+
+    properties = {}
+    for name, field_type in read_schema(schema_file):
+        if field_type not in SCHEMA_TYPES:
+            raise ValueError("Unknown type {} for field {}".format(field_type, name))
+        properties[name] = dict(SCHEMA_TYPES[field_type])
+
+    return {"properties": properties}
+
+
+if __name__ == '__main__':
+    print(json.dumps(get_schema_mapping(sys.argv[1]), indent=4))
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sqlalchemy import func
+    from sortinghat import utils
+    from sortinghat.db.model import Identity, UniqueIdentity
+    from sortinghat.exceptions import InvalidValueError
+
+    SORTINGHAT_LIBS = True
+except ImportError:
+    logger.info("SortingHat not available")
+    SORTINGHAT_LIBS = False
+
+
+def get_sortinghat_version(db):
+    """Get a stamp which changes whenever the SortingHat identities change.
+
+    :param db: SortingHat database
+    :returns: string with the latest modification dates of the identities
+        and unique identities, and the number of identities
+    """
+    with db.connect() as session:
+        identities = session.query(func.max(Identity.last_modified),
+                                   func.count(Identity.id)).one()
+        uidentities = session.query(func.max(UniqueIdentity.last_modified)).one()
+
+    return "{}_{}_{}".format(identities[0], uidentities[0], identities[1])
+
+
+class IdentityCache:
+    """Cache of the SortingHat ids of survey respondents.
+
+    Respondents are identified by their (username, email) pair. The cache
+    can be stored in a JSON file together with the SortingHat version it
+    was built with; a cache built with a different version is discarded.
+
+    :param path: JSON file to load the cache from and save it to; if None,
+        the cache is only kept in memory
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.loaded = False
+        self.sh_ids = {}
+        self.uuids = {}
+        self.seen = set()
+
+    def load(self, version):
+        """Load the cache file if it was built with the given SortingHat version"""
+
+        self.loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        with open(self.path) as fd:
+            data = json.load(fd)
+
+        if data.get('version') != version:
+            logger.debug("[surveyqq] SortingHat changed, identities cache discarded")
+            return
+
+        for username, email, sh_id, uuid in data['identities']:
+            self.__add((username, email), sh_id, uuid)
+
+        logger.debug("[surveyqq] {} identities loaded from cache".format(len(self.sh_ids)))
+
+    def save(self, version):
+        """Store the cache file, stamped with the given SortingHat version"""
+
+        if not self.path:
+            return
+
+        identities = [[username, email, sh_id, self.uuids[sh_id]]
+                      for (username, email), sh_id in self.sh_ids.items()]
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as fd:
+            json.dump({'version': version, 'identities': identities}, fd)
+        os.replace(tmp_path, self.path)
+
+    def __add(self, key, sh_id, uuid):
+        self.sh_ids[key] = sh_id
+        self.uuids[sh_id] = uuid
+
+    def get(self, identity):
+        """Get the SortingHat id of an identity, or None if it is not cached"""
+
+        return self.sh_ids.get((identity['username'], identity['email']))
+
+    def is_new(self, identity):
+        """Check whether an identity has to be registered in SortingHat.
+
+        Identities already resolved or seen before in this run are not new.
+        """
+        key = (identity['username'], identity['email'])
+        if key in self.sh_ids or key in self.seen:
+            return False
+
+        self.seen.add(key)
+        return True
+
+    def get_uuid(self, sh_id):
+        """Get the uuid of a cached SortingHat id, or None"""
+
+        return self.uuids.get(sh_id)
+
+    def resolve(self, db, backend_name, identities):
+        """Resolve the identities missing in the cache with a single query.
+
+        :param db: SortingHat database
+        :param backend_name: SortingHat source of the identities
+        :param identities: list of identity dicts
+        :returns: number of identities resolved
+        """
+        missing = {}
+        for identity in identities:
+            key = (identity['username'], identity['email'])
+            if key in self.sh_ids:
+                continue
+            try:
+                sh_id = utils.uuid(backend_name, email=identity['email'],
+                                   name=identity['name'], username=identity['username'])
+            except (InvalidValueError, UnicodeEncodeError):
+                continue
+            missing[sh_id] = key
+
+        if not missing:
+            return 0
+
+        with db.connect() as session:
+            rows = session.query(Identity.id, Identity.uuid).filter(Identity.id.in_(list(missing))).all()
+
+        for sh_id, uuid in rows:
+            self.__add(missing[sh_id], sh_id, uuid)
+
+        return len(rows)
@@ -19,32 +19,49 @@
 #   Yehui Wang <yehui.wang.mdh@gmail.com>
 #
 
+import itertools
 import logging
 import re
 import json
 
+import pkg_resources
 import requests
 
 from dateutil.relativedelta import relativedelta
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from grimoire_elk.elastic import ElasticSearch
+from grimoire_elk.errors import ELKError
 from grimoirelab_toolkit.datetime import (datetime_utcnow,
                                           str_to_datetime)
 
 from elasticsearch import Elasticsearch as ES, RequestsHttpConnection
 
-from grimoire_elk.enriched.utils import get_time_diff_days
-
-
-from grimoire_elk.enriched.enrich import Enrich, metadata
+from grimoire_elk.enriched.enrich import Enrich, metadata, DEFAULT_PROJECT, SH_UNKNOWN_VALUE
+from grimoire_elk.enriched.study_ceres_onion import ESOnionConnector, onion_study
 from grimoire_elk.elastic_mapping import Mapping as BaseMapping
 
+from .. import config
+from ..bulk import MAX_BULK_BYTES, BulkBuffer, ConcurrentBulkBuffer
+from ..metrics import Metrics, get_environ_metrics
+from . import ages, fingerprints, onion, parallel, projects, rollups, timeline, validation
+from .bots import DEFAULT_BOTS, BotDetector
+from .comments import CommentIndex
+from .dates import datetime_to_epoch, diff_days, parse_date, str_to_epoch
+from .issues import IssueMetricsCache
+from .questionnaire import QuestionnaireLayouts
+from .sortinghat import IdentityCache, get_sortinghat_version
 
 GITEE = 'https://gitee.com/'
 GITEE_ISSUES = "gitee_issues"
 GITEE_MERGES = "gitee_pulls"
 
+# Field storing the reasons given in the survey for each possible score
+SCORE_REASON_FIELDS = {score: 'issue_unsatisfied' if score < 7 else
+                       'issue_to_improve' if score < 9 else
+                       'issue_satisfied'
+                       for score in range(0, 11)}
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,33 +70,16 @@ class Mapping(BaseMapping):
     @staticmethod
     def get_elastic_mappings(es_major):
         """Get Elasticsearch mapping.
-        geopoints type is not created in dynamic mapping
+
+        The mapping is generated from the schema of the enriched index
+        (see `schema.py`), so survey scores and durations are numeric.
+
         :param es_major: major version of Elasticsearch, as string
         :returns:        dictionary with a key, 'items', with the mapping
         """
-
-        mapping = """
-        {
-            "properties": {
-               "merge_author_geolocation": {
-                   "type": "geo_point"
-               },
-               "assignee_geolocation": {
-                   "type": "geo_point"
-               },
-               "state": {
-                   "type": "keyword"
-               },
-               "user_geolocation": {
-                   "type": "geo_point"
-               },
-               "title_analyzed": {
-                 "type": "text",
-                 "index": true
-               }
-            }
-        }
-        """
+        filename = pkg_resources.resource_filename('grimoire_elk_surveyqq', 'enriched/mappings/surveyqq.json')
+        with open(filename) as fd:
+            mapping = fd.read()
 
         return {"items": mapping}
 
@@ -97,16 +97,186 @@ class SurveyqqEnrich(Enrich):
         super().__init__(db_sortinghat, db_projects_map, json_projects_map,
                          db_user, db_password, db_host)
 
+        self.layouts = QuestionnaireLayouts()
+        self.issue_metrics = IssueMetricsCache()
+        self.identities_cache = IdentityCache()
+        self.workers = None
+        self.reference_date = None
+        self.metrics = Metrics()
+        self.quarantine_index = None
+        self.quarantine = None
+        self.project_index = None
+        self.bulk_concurrency = None
+        self.skip_unchanged = False
+        self.config_fingerprint = None
+        self.es = None
+        self.bots = DEFAULT_BOTS
+
         self.studies = []
         self.studies.append(self.enrich_onion)
+        self.studies.append(self.enrich_survey_rollups)
+        self.studies.append(self.enrich_open_issues_age)
+        self.studies.append(self.enrich_issue_timeline)
         # self.studies.append(self.enrich_pull_requests)
         # self.studies.append(self.enrich_geolocation)
         # self.studies.append(self.enrich_extra_data)
         # self.studies.append(self.enrich_backlog_analysis)
 
+        self.configure()
+
+    def configure(self, environ=None):
+        """Apply the options of the enricher set in the environment.
+
+        Options are read from `SURVEYQQ_<OPTION>` variables (see `config`)
+        and passed to the setter of each option:
+
+        - `SURVEYQQ_WORKERS`: number of processes, see `set_workers`
+        - `SURVEYQQ_IDENTITIES_CACHE`: JSON file with the SortingHat ids of
+          the respondents, see `set_identities_cache`
+        - `SURVEYQQ_METRICS`: time the stages of the enrichment, see
+          `get_environ_metrics` and `set_metrics`
+        - `SURVEYQQ_QUARANTINE_INDEX`: index of the malformed raw items,
+          see `set_quarantine_index`
+        - `SURVEYQQ_BULK_CONCURRENCY`: number of bulk requests in flight,
+          see `set_bulk_concurrency`
+        - `SURVEYQQ_BOTS`: JSON file with the bots, see `set_bots`
+        - `SURVEYQQ_SKIP_UNCHANGED`: skip the answers whose fingerprint
+          did not change, see `set_skip_unchanged`
+
+        :param environ: dict of environment variables; `os.environ` by default
+        """
+        workers = config.get_int_option('workers', environ)
+        if workers is not None:
+            self.set_workers(workers)
+
+        identities_cache = config.get_option('identities_cache', environ)
+        if identities_cache:
+            self.set_identities_cache(identities_cache)
+
+        metrics = get_environ_metrics(environ)
+        if metrics:
+            self.set_metrics(metrics)
+
+        quarantine_index = config.get_option('quarantine_index', environ)
+        if quarantine_index:
+            self.set_quarantine_index(quarantine_index)
+
+        bulk_concurrency = config.get_int_option('bulk_concurrency', environ)
+        if bulk_concurrency is not None:
+            self.set_bulk_concurrency(bulk_concurrency)
+
+        bots = config.get_option('bots', environ)
+        if bots:
+            self.set_bots(bots)
+
+        skip_unchanged = config.get_bool_option('skip_unchanged', environ)
+        if skip_unchanged is not None:
+            self.set_skip_unchanged(skip_unchanged)
+
     def set_elastic(self, elastic):
         self.elastic = elastic
 
+    def set_survey_titles(self, titles):
+        """Locate the survey fields by the title of their questions.
+
+        :param titles: dict mapping survey fields (see `SURVEY_FIELDS`)
+            to a text contained in the title of their question
+        """
+        self.layouts = QuestionnaireLayouts(titles, self.layouts.question_ids)
+
+    def set_survey_questions(self, question_ids):
+        """Locate the survey fields by the id of their questions in the survey definition.
+
+        :param question_ids: dict mapping survey fields (see `SURVEY_FIELDS`)
+            to the id of their question
+        """
+        self.layouts = QuestionnaireLayouts(self.layouts.titles, question_ids)
+
+    def set_issue_cache_size(self, size):
+        """Set the maximum number of issues whose metrics are cached"""
+
+        self.issue_metrics = IssueMetricsCache(size)
+
+    def set_identities_cache(self, path):
+        """Keep the SortingHat ids of the respondents in a JSON file between runs"""
+
+        self.identities_cache = IdentityCache(path)
+
+    def set_workers(self, workers):
+        """Enrich the items using a pool of `workers` processes.
+
+        :param workers: number of processes; 1 or None to enrich
+            the items in the current process
+        """
+        self.workers = workers
+
+    def set_reference_date(self, date):
+        """Compute the age of open issues from a fixed date.
+
+        :param date: naive UTC datetime; if None, the date
+            each enrichment run starts is used
+        """
+        self.reference_date = date
+
+    def set_quarantine_index(self, index):
+        """Store the malformed raw items in `index`, with the reasons they are not valid.
+
+        :param index: name of the quarantine index; if None, malformed
+            items are only logged and skipped
+        """
+        self.quarantine_index = index
+        self.quarantine = None
+
+    def set_bulk_concurrency(self, concurrency):
+        """Upload the rich items with `concurrency` bulk requests in flight.
+
+        :param concurrency: number of concurrent bulk requests, see
+            `ConcurrentBulkBuffer`; 1 or None to upload one block at a time
+        """
+        self.bulk_concurrency = concurrency
+
+    def set_skip_unchanged(self, skip_unchanged=True):
+        """Do not enrich again the answers whose fingerprint did not change.
+
+        The fingerprint of each raw item (see `fingerprints.get_fingerprint`)
+        is stored in its rich item; when enabled, items whose fingerprint
+        is already in the enriched index are skipped. The age of open
+        issues is then kept up to date by `enrich_open_issues_age`.
+
+        The fingerprint includes the projects map, the bots and the survey
+        titles and questions, so any change in them makes the next run
+        enrich all the answers again, and the SortingHat id and uuid of
+        the respondent, so answers are enriched again when their
+        respondent is registered or merged with another identity.
+        """
+        self.skip_unchanged = skip_unchanged
+
+    def set_bots(self, bots):
+        """Set how commenters are classified as bots.
+
+        :param bots: a `BotDetector`, or the path of a JSON file with
+            the `logins`, `suffixes` and `patterns` of the bots
+        """
+        if isinstance(bots, str):
+            bots = BotDetector.from_file(bots)
+        self.bots = bots
+
+        # Cached issue metrics and fingerprints depend on the bots
+        self.issue_metrics.clear()
+        self.config_fingerprint = None
+
+    def set_metrics(self, metrics):
+        """Time the stages of the enrichment with a `Metrics` object"""
+
+        self.metrics = metrics
+
+    def get_reference_date(self):
+        """Get the date the age of open issues is computed from"""
+
+        if self.reference_date:
+            return self.reference_date
+        return datetime_utcnow().replace(tzinfo=None)
+
     def get_field_author(self):
         return "user_data"
 
@@ -116,9 +286,11 @@ class SurveyqqEnrich(Enrich):
 
     def get_identities(self, item):
         """Return the identities from an item"""
-        item = item['data']
-        user = self.get_sh_identity(item["answer"])
-        return user
+        user = self.get_sh_identity(item['data']["answer"], origin=item.get('origin'))
+
+        # Skip respondents already known in SortingHat or seen in this run
+        self.__load_identities_cache()
+        return [identity for identity in user if self.identities_cache.is_new(identity)]
 
         # if category == "issue":
         #     identity_types = ['user', 'assignee']
@@ -135,33 +307,382 @@ class SurveyqqEnrich(Enrich):
         #         if user:
         #             yield user
 
-    def get_sh_identity(self, item_answer, identity_field=None):
+    def get_sh_identity(self, item_answer, identity_field=None, origin=None):
         identity = {}
 
         # by default a specific user dict is expected
-        user_answer = item_answer[0]["questions"]
-        identity['username'] = user_answer[0]["text"]
-        identity['email'] = user_answer[1]["text"]
+        survey = self.layouts.extract(item_answer[0], origin)
+        identity['username'] = survey['user_login']
+        identity['email'] = survey['user_email']
         identity['name'] = None
         return [identity]
 
+    def get_uuid_from_id(self, sh_id):
+        uuid = self.identities_cache.get_uuid(sh_id)
+        if uuid:
+            return uuid
+
+        return super().get_uuid_from_id(sh_id)
+
+    def __load_identities_cache(self):
+        if self.sortinghat and not self.identities_cache.loaded:
+            self.identities_cache.load(get_sortinghat_version(self.sh_db))
+
+    def __save_identities_cache(self):
+        if self.sortinghat:
+            self.identities_cache.save(get_sortinghat_version(self.sh_db))
+
+    def get_grimoire_fields(self, creation_date, item_name):
+        """Return common grimoire fields, parsing the date with the fast parser"""
+
+        grimoire_date = None
+        try:
+            grimoire_date = parse_date(creation_date).isoformat()
+        except Exception:
+            pass
+
+        name = "is_" + self.get_connector_name() + "_" + item_name
+
+        return {
+            "grimoire_creation_date": grimoire_date,
+            name: 1
+        }
+
     def get_project_repository(self, eitem):
         repo = eitem['origin']
         return repo
 
     @metadata
     def get_rich_item(self, item):
+        return self.get_rich_items([item])[0]
+
+    def get_rich_items(self, items):
+        """Create the rich items for a block of raw items.
+
+        The work which does not depend on a single item, such as the
+        reference date and the metadata stamp, is done once per block.
+
+        :param items: list of raw items
+        :returns: list of rich items, in the same order as `items`
+        """
+        rich_items = self.get_rich_surveys(items, self.get_reference_date())
+        self.__complete_rich_items(items, rich_items)
+
+        return rich_items
+
+    def get_rich_surveys(self, items, now):
+        """Compute the survey and issue fields of a block of raw items.
+
+        These fields do not depend on SortingHat nor on the projects map,
+        so they can be computed by a different process than the one
+        completing and uploading the rich items.
+
+        :param items: list of raw items
+        :param now: naive UTC datetime used as reference date for open issues
+        :returns: list of partial rich items, in the same order as `items`
+        """
+        now = datetime_to_epoch(now)
+
+        rich_items = []
+        for item in items:
+            rich_item = {}
+            if item['category'] == 'issue':
+                with self.metrics.stage('survey'):
+                    rich_item = self.__get_rich_survey(item, now)
+            else:
+                logger.error("[github] rich item not defined for GitHub category {}".format(
+                             item['category']))
+            rich_items.append(rich_item)
+
+        return rich_items
+
+    def enrich_items(self, ocean_backend, events=False):
+        """Enrich the raw items fetched from `ocean_backend` in blocks
+        of `max_items_bulk` items, uploading each block with a single
+        bulk request.
+
+        When more than one worker is set, blocks are enriched by a pool
+        of processes and uploaded in the order they are finished. The age
+        of open issues is computed from the same date for all the blocks.
+        With a bulk concurrency, rich items are uploaded by a
+        `ConcurrentBulkBuffer` instead of a request per block.
+
+        :param ocean_backend: Ocean backend object to fetch the items from
+        :param events: enrich items or enrich events
+        :returns: total number of enriched items uploaded to Elasticsearch
+        """
+        if events:
+            return super().enrich_items(ocean_backend, events=events)
+
+        url = self.elastic.get_bulk_url()
+        total = 0
+        now = self.get_reference_date()
+        # The settings may have changed since the last run
+        self.config_fingerprint = None
+
+        blocks = self.__get_blocks(ocean_backend.fetch(), self.elastic.max_items_bulk)
+        if self.workers and self.workers > 1:
+            logger.info("[surveyqq] Enriching items with {} workers".format(self.workers))
+            surveys = parallel.get_rich_surveys(blocks, type(self), self.layouts,
+                                                self.workers, now, self.bots)
+        else:
+            surveys = ((block, self.get_rich_surveys(block, now)) for block in blocks)
+
+        writer = None
+        if self.bulk_concurrency and self.bulk_concurrency > 1:
+            writer = ConcurrentBulkBuffer(self.elastic, self.bulk_concurrency)
+
+        try:
+            for block, rich_items in surveys:
+                self.__complete_rich_items(block, rich_items)
+                self.metrics.inc('enriched_items', len(block))
+
+                if writer:
+                    with self.metrics.stage('bulk'):
+                        for item, rich_item in zip(block, rich_items):
+                            writer.add(item[self.get_field_unique_id()], rich_item)
+                else:
+                    with self.metrics.stage('json'):
+                        bulk_json = self.__get_bulk_json(block, rich_items)
+                    with self.metrics.stage('bulk'):
+                        inserted = self.elastic.safe_put_bulk(url, bulk_json)
+                    total += inserted
+                    self.metrics.inc('bulk_errors', len(block) - inserted)
+
+                self.metrics.maybe_report()
+        except Exception:
+            # Release the pool of the writer without hiding the error
+            if writer:
+                try:
+                    writer.close()
+                except Exception as ex:
+                    logger.warning("[surveyqq] Error closing the bulk writer: {}".format(ex))
+            raise
+
+        if writer:
+            total = writer.close()
+            self.metrics.inc('bulk_errors', writer.total - writer.inserted)
+
+        logger.debug("[surveyqq] Issue metrics cache: {} hits, {} misses".format(
+                     self.issue_metrics.hits, self.issue_metrics.misses))
+
+        self.__save_identities_cache()
+        self.metrics.report()
+
+        return total
+
+    def __get_blocks(self, items, size):
+        items = iter(items or [])
+        while True:
+            with self.metrics.stage('fetch'):
+                block = list(itertools.islice(items, size))
+            if not block:
+                break
+            block = self.validate_items(block)
+            if block and self.skip_unchanged:
+                block = self.__get_changed_items(block)
+            if block:
+                yield block
+
+    def __get_changed_items(self, items):
+        """Get the items whose fingerprint differs from the one of their rich item"""
+
+        if not self.es:
+            self.es = ES([self.elastic.url], retry_on_timeout=True, timeout=100,
+                         verify_certs=self.elastic.requests.verify, connection_class=RequestsHttpConnection)
+
+        # The SortingHat identity of the respondent is part of the fingerprint
+        if self.sortinghat:
+            self.__resolve_respondents(items)
+
+        field_id = self.get_field_unique_id()
+        with self.metrics.stage('fingerprints'):
+            stored = fingerprints.get_fingerprints(self.es, self.elastic.index,
+                                                   [item[field_id] for item in items])
+            changed = [item for item in items
+                       if stored.get(item[field_id]) != self.__get_fingerprint(item)]
+
+        self.metrics.inc('unchanged_items', len(items) - len(changed))
+        logger.debug("[surveyqq] {}/{} items unchanged".format(len(items) - len(changed), len(items)))
+
+        return changed
+
+    def __resolve_respondents(self, items):
+        """Resolve the SortingHat ids of the respondents of some raw items with a single query"""
+
+        self.__load_identities_cache()
+        identities = [self.get_sh_identity(item['data']['answer'], origin=item.get('origin'))[0] for item in items]
+        with self.metrics.stage('sortinghat'):
+            self.identities_cache.resolve(self.sh_db, self.get_connector_name(), identities)
+
+    def __get_fingerprint(self, item):
+        """Get the fingerprint of a raw item, of the SortingHat identity of its
+        respondent and of the configuration it is enriched with.
+
+        Respondents must be resolved (see `__resolve_respondents`) before.
+        """
+
+        if self.config_fingerprint is None:
+            bots = self.bots
+            config = {
+                'projects': self.prjs_map,
+                'bots': [sorted(bots.logins), list(bots.suffixes), list(bots.patterns)],
+                'titles': self.layouts.titles,
+                'question_ids': self.layouts.question_ids,
+                'sortinghat': bool(self.sortinghat)
+            }
+            self.config_fingerprint = fingerprints.get_config_fingerprint(config)
+
+        identity = None
+        if self.sortinghat:
+            sh_id = self.identities_cache.get(self.get_sh_identity(item['data']['answer'],
+                                                                   origin=item.get('origin'))[0])
+            identity = [sh_id, self.identities_cache.get_uuid(sh_id)]
+
+        return fingerprints.get_fingerprint(item, self.config_fingerprint, identity)
+
+    def validate_items(self, items, quarantine_buffer=None):
+        """Split a block of raw items into valid and malformed items.
 
-        rich_item = {}
-        if item['category'] == 'issue':
-            rich_item = self.__get_rich_survey(item)
+        Malformed items, which would make the enrichment fail, are
+        logged and stored in the quarantine index, if any.
+
+        :param items: list of raw items
+        :param quarantine_buffer: `BulkBuffer` of the quarantine index (see
+            `get_quarantine_buffer`) the malformed items are added to; if
+            None, they are uploaded with a bulk request per block
+        :returns: list with the valid items
+        """
+        with self.metrics.stage('validation'):
+            checks = [(item, validation.validate_item(item, self.layouts)) for item in items]
+
+        valid = [item for item, reasons in checks if not reasons]
+        if len(valid) == len(items):
+            return valid
+
+        malformed = [(item, reasons) for item, reasons in checks if reasons]
+        for item, reasons in malformed:
+            logger.warning("[surveyqq] Malformed item {}: {}".format(item.get('uuid'), ", ".join(reasons)))
+        self.metrics.inc('malformed_items', len(malformed))
+
+        if self.quarantine_index:
+            self.__quarantine_items(malformed, quarantine_buffer)
+
+        return valid
+
+    def get_quarantine_buffer(self, max_bytes=MAX_BULK_BYTES):
+        """Get a `BulkBuffer` of the quarantine index, or None if there is no quarantine index"""
+
+        if not self.quarantine_index:
+            return None
+        return BulkBuffer(self.__get_quarantine(), max_bytes)
+
+    def __get_quarantine(self):
+        if not self.quarantine:
+            self.quarantine = ElasticSearch(self.elastic.url, self.quarantine_index,
+                                            mappings=validation.Mapping)
+        return self.quarantine
+
+    def __quarantine_items(self, malformed, quarantine_buffer=None):
+        quarantined_on = datetime_utcnow().isoformat()
+        items = [validation.get_quarantine_item(item, reasons, quarantined_on)
+                 for item, reasons in malformed]
+
+        if quarantine_buffer:
+            for item in items:
+                quarantine_buffer.add(item['uuid'], item)
         else:
-            logger.error("[github] rich item not defined for GitHub category {}".format(
-                         item['category']))
+            self.__get_quarantine().bulk_upload(items, "uuid")
+
+    def __get_bulk_json(self, items, rich_items):
+        field_id = self.get_field_unique_id()
+
+        bulk_json = ""
+        for item, rich_item in zip(items, rich_items):
+            bulk_json += '{"index" : {"_id" : "%s" } }\n' % (item[field_id])
+            bulk_json += json.dumps(rich_item) + "\n"
+
+        return bulk_json
+
+    def __complete_rich_items(self, items, rich_items):
+        item_metadata = {
+            'metadata__gelk_version': self.gelk_version,
+            'metadata__gelk_backend_name': self.__class__.__name__,
+            'metadata__enriched_on': datetime_utcnow().isoformat()
+        }
+
+        if self.sortinghat:
+            self.__resolve_respondents([item for item, rich_item in zip(items, rich_items) if rich_item])
+
+        for item, rich_item in zip(items, rich_items):
+            self.__complete_rich_item(item, rich_item)
+            rich_item.update(item_metadata)
+
+    def __complete_rich_item(self, item, rich_item):
+        """Add the project, SortingHat and label fields to a partial rich item"""
+
+        if rich_item:
+            if self.prjs_map:
+                with self.metrics.stage('projects'):
+                    rich_item.update(self.__get_item_project(item, rich_item))
+
+            if 'project' in item:
+                rich_item['project'] = item['project']
+
+            rich_item[fingerprints.FINGERPRINT_FIELD] = self.__get_fingerprint(item)
+            item[self.get_field_date()] = rich_item[self.get_field_date()]
+            identity = self.get_sh_identity(item['data']['answer'], origin=item.get('origin'))[0]
+            with self.metrics.stage('sortinghat'):
+                rich_item.update(self.__get_respondent_sh(identity, parse_date(item[self.get_field_date()])))
 
         self.add_repository_labels(rich_item)
         self.add_metadata_filter_raw(rich_item)
-        return rich_item
+
+    def __get_item_project(self, item, eitem):
+        """Get the project fields of the rich item of a raw item.
+
+        The project is the one of the repository of the issue in the
+        answer; answers whose repository is not in the projects map get
+        the project of their origin, as `get_item_project` does.
+        """
+        if self.project_index is None:
+            self.project_index = projects.ProjectIndex(self.prjs_map)
+
+        project = self.project_index.get_project(eitem.get('issue_link'))
+        if project is None:
+            # Rich items have no origin, which `find_item_project` reads
+            origin_eitem = dict(eitem, origin=item.get('origin'))
+            project = self.project_index.get_origin_project(item.get('origin'),
+                                                            lambda: self.find_item_project(origin_eitem))
+        if project is None:
+            project = DEFAULT_PROJECT
+
+        eitem_project = {"project": project}
+        eitem_project.update(self.add_project_levels(project))
+        eitem_project.update(self.get_item_metadata(eitem))
+
+        return eitem_project
+
+    def __get_respondent_sh(self, identity, item_date, rol='author'):
+        """Get the SortingHat fields of the respondent of a survey"""
+
+        if not self.sortinghat:
+            eitem_sh = self.get_item_no_sh_fields(identity, rol)
+        else:
+            sh_id = self.identities_cache.get(identity)
+            if sh_id:
+                eitem_sh = self.get_item_sh_fields(sh_id=sh_id, item_date=item_date, rol=rol)
+                eitem_sh[rol + "_user_name"] = identity['username']
+                if not eitem_sh.get(rol + "_domain"):
+                    eitem_sh[rol + "_domain"] = self.get_identity_domain(identity)
+            else:
+                eitem_sh = self.get_item_sh_fields(identity, item_date, rol=rol)
+
+        for field in ['_org_name', '_name', '_user_name']:
+            if not eitem_sh.get(rol + field):
+                eitem_sh[rol + field] = SH_UNKNOWN_VALUE
+
+        return eitem_sh
 
     def is_right_issue_link(self, data):
         if data not in ["Invalid Issue Link", "Can't get message about Issue"]:
@@ -179,92 +700,101 @@ class SurveyqqEnrich(Enrich):
             return min(comment_dates)
         return None
 
-    def get_time_to_first_attention_without_bot(self, item):
+    def get_time_to_first_attention_without_bot(self, item, comments=None):
         """Get the first date at which a comment was made to the issue by someone
         other than the user who created the issue and bot
+
+        :param item: raw item data
+        :param comments: `CommentIndex` of the issue, built from `item` if not given
         """
-        comment_dates = [str_to_datetime(comment['created_at']) for comment in item['comment_data']
-                         if item['issue_data']['user']['login'] != comment['user']['login']
-                         and not (comment['user']['name'].endswith("-bot"))]
-        if comment_dates:
-            return min(comment_dates)
-        return None
+        if comments is None:
+            comments = CommentIndex(item['issue_data'], item['comment_data'], self.bots)
+        return comments.first_attention
 
-    def __get_rich_survey(self, item):
+    def __get_rich_survey(self, item, now):
         rich_survey = {}
 
-        survey = item['data']['answer'][0]['questions']
-        rich_survey['user_login'] = survey[0]['text']
-        rich_survey['user_email'] = survey[1]['text']
-        rich_survey['issue_link'] = survey[2]['text']
-        rich_survey['survey_score'] = survey[3]['text']
-        rich_survey['participated_reason'] = [op['text']
-                                              for op in survey[5]['options']]
-        score = int(rich_survey['survey_score'])
-        if score in range(0, 7):
-            rich_survey['issue_unsatisfied'] = [op['text']
-                                                for op in survey[4]['options']]
-        elif score in range(7, 9):
-            rich_survey['issue_to_improve'] = [op['text']
-                                               for op in survey[4]['options']]
-        elif score in range(9, 11):
-            rich_survey['issue_satisfied'] = [op['text']
-                                              for op in survey[4]['options']]
-        rich_survey['user_appeal'] = [op['text']
-                                      for op in survey[6]['options']]
+        with self.metrics.stage('extract'):
+            survey = self.layouts.extract(item['data']['answer'][0], item.get('origin'))
+        rich_survey['user_login'] = survey['user_login']
+        rich_survey['user_email'] = survey['user_email']
+        rich_survey['issue_link'] = survey['issue_link']
+        rich_survey['survey_score'] = int(survey['survey_score'])
+        rich_survey['participated_reason'] = survey['participated_reason']
+        reason_field = SCORE_REASON_FIELDS.get(rich_survey['survey_score'])
+        if reason_field:
+            rich_survey[reason_field] = survey['score_reasons']
+        rich_survey['user_appeal'] = survey['user_appeal']
 
         if self.is_right_issue_link(item['data']['issue_data']):
             issue = item['data']['issue_data']
+            metrics = self.issue_metrics.get(issue, lambda: self.__get_issue_metrics(item['data']))
             rich_survey['survey_answer_role'] = self.__get_survey_answer_role(
-                rich_survey['user_login'], item['data'])
+                rich_survey['user_login'], item['data'], metrics['comments'])
 
-            if issue['state'] == 'open' or issue['state'] == 'progressing':
+            rich_survey['issue_state'] = issue['state']
+            rich_survey['issue_created_at'] = issue['created_at']
+            if ages.is_open(issue):
                 rich_survey['issue_time_open_days'] = \
-                    get_time_diff_days(
-                        issue['created_at'], datetime_utcnow().replace(tzinfo=None))
-            else:
-                rich_survey['issue_time_open_days'] = get_time_diff_days(
-                    issue['created_at'], issue['finished_at'])
-
-            if item['data']['comment_data'] != []:
-                rich_survey['issue_time_to_first_attention'] = get_time_diff_days(str_to_datetime(issue['created_at']),
-                                                                                  self.get_time_to_first_attention_without_bot(item['data']))
+                    diff_days(str_to_epoch(issue['created_at']), now)
             else:
-                rich_survey['issue_time_to_first_attention'] = None
+                rich_survey['issue_time_open_days'] = metrics['issue_time_open_days']
 
-            labels = []
-            [labels.append(label['name'])
-             for label in issue['labels'] if 'labels' in issue]
-            rich_survey['issue_labels'] = labels
-
-            rich_survey['issue_milestone'] = issue['milestone']['title'] if issue['milestone'] else None
+            rich_survey['issue_time_to_first_attention'] = metrics['issue_time_to_first_attention']
+            rich_survey['issue_labels'] = list(metrics['issue_labels'])
+            rich_survey['issue_milestone'] = metrics['issue_milestone']
 
         else:
             rich_survey['survey_answer_role'] = None
+            rich_survey['issue_state'] = None
+            rich_survey['issue_created_at'] = None
             rich_survey['issue_time_open_days'] = None
             rich_survey['issue_time_to_first_attention'] = None
             rich_survey['issue_labels'] = None
             rich_survey['issue_milestone'] = None
 
-        if self.prjs_map:
-            rich_survey.update(self.get_item_project(rich_survey))
+        with self.metrics.stage('dates'):
+            rich_survey.update(self.get_grimoire_fields(
+                item['data']['started_at'], 'issue'))
+
+        return rich_survey
 
-        if 'project' in item:
-            rich_survey['project'] = item['project']
+    def __get_issue_metrics(self, item):
+        """Compute the metrics which only depend on the issue of an answer"""
 
-        rich_survey.update(self.get_grimoire_fields(
-            item['data']['started_at'], 'issue'))
+        issue = item['issue_data']
+        with self.metrics.stage('comments'):
+            comments = CommentIndex(issue, item['comment_data'], self.bots)
 
-        item[self.get_field_date()] = rich_survey[self.get_field_date()]
-        rich_survey.update(self.get_item_sh(item, self.pr_roles))
-        return rich_survey
+        metrics = {
+            'comments': comments,
+            'issue_time_open_days': None,
+            'issue_time_to_first_attention': None
+        }
+
+        if not ages.is_open(issue):
+            metrics['issue_time_open_days'] = diff_days(
+                str_to_epoch(issue['created_at']), str_to_epoch(issue['finished_at']))
+
+        if item['comment_data'] != []:
+            metrics['issue_time_to_first_attention'] = diff_days(str_to_epoch(issue['created_at']),
+                                                                 comments.first_attention_ts)
+
+        labels = []
+        [labels.append(label['name'])
+         for label in issue['labels'] if 'labels' in issue]
+        metrics['issue_labels'] = labels
 
-    def __get_survey_answer_role(self, name, item):
+        metrics['issue_milestone'] = issue['milestone']['title'] if issue['milestone'] else None
+
+        return metrics
+
+    def __get_survey_answer_role(self, name, item, comments):
         if name in [item['issue_data']['user']['login'], item['issue_data']['user']['name']]:
             return 'issue_owner'
         elif item['issue_data']['assignee'] and name in item['issue_data']['assignee']:
             return 'assignee'
-        elif name in [user['user']['login'] for user in item['comment_data']]:
+        elif name in comments.responders:
             return 'commenter'
 
         return None
@@ -275,7 +805,13 @@ class SurveyqqEnrich(Enrich):
                      timeframe_field='grimoire_creation_date',
                      sort_on_field='metadata__timestamp',
                      seconds=Enrich.ONION_INTERVAL):
+        """Compute the onion study of the survey answers.
 
+        The first run, and any run with `no_incremental`, computes the whole
+        study. Next runs only recompute the quarters with answers enriched
+        after the previous run, whose date is kept in a checkpoint item of
+        the output index.
+        """
         if not data_source:
             raise ELKError(cause="Missing data_source attribute")
 
@@ -283,12 +819,190 @@ class SurveyqqEnrich(Enrich):
             logger.warning("[gitee] data source value {} should be: {} or {}".format(
                 data_source, GITEE_ISSUES, GITEE_MERGES))
 
-        super().enrich_onion(enrich_backend=enrich_backend,
-                             in_index=in_index,
-                             out_index=out_index,
-                             data_source=data_source,
-                             contribs_field=contribs_field,
-                             timeframe_field=timeframe_field,
-                             sort_on_field=sort_on_field,
-                             no_incremental=no_incremental,
-                             seconds=seconds)
+        log_prefix = "[" + data_source + "] study onion"
+
+        es = ES([enrich_backend.elastic.url], retry_on_timeout=True, timeout=100,
+                verify_certs=self.elastic.requests.verify, connection_class=RequestsHttpConnection)
+        es_major = enrich_backend.elastic.major
+
+        checkpoint = None
+        if not no_incremental and es.indices.exists(index=out_index):
+            checkpoint = onion.read_checkpoint(es, out_index, es_major)
+
+        if not checkpoint:
+            super().enrich_onion(enrich_backend=enrich_backend,
+                                 in_index=in_index,
+                                 out_index=out_index,
+                                 data_source=data_source,
+                                 contribs_field=contribs_field,
+                                 timeframe_field=timeframe_field,
+                                 sort_on_field=sort_on_field,
+                                 no_incremental=no_incremental,
+                                 seconds=seconds)
+
+            if es.indices.exists(index=out_index):
+                out_conn = ESOnionConnector(es_conn=es, es_index=out_index,
+                                            contribs_field=contribs_field,
+                                            timeframe_field=timeframe_field,
+                                            sort_on_field=sort_on_field)
+                latest_date = out_conn.latest_enrichment_date()
+                if latest_date:
+                    onion.write_checkpoint(es, out_index, es_major, latest_date)
+            return
+
+        update_after = checkpoint + timedelta(seconds=seconds)
+        if update_after >= datetime_utcnow():
+            logger.info("{} too soon to update. Next update will be at {}".format(
+                        log_prefix, update_after.isoformat()))
+            return
+
+        run_date = datetime_utcnow()
+        quarters = onion.get_touched_quarters(es, in_index, timeframe_field, checkpoint)
+        if not quarters:
+            logger.info("{} no new items since {}".format(log_prefix, checkpoint.isoformat()))
+            onion.write_checkpoint(es, out_index, es_major, run_date, quarters)
+            return
+
+        logger.info("{} recomputing quarters {}".format(log_prefix, ", ".join(quarters)))
+
+        in_conn = onion.SurveyqqOnionConnector(es_conn=es, es_index=in_index,
+                                               contribs_field=contribs_field,
+                                               timeframe_field=timeframe_field,
+                                               sort_on_field=sort_on_field,
+                                               quarters=quarters)
+        out_conn = ESOnionConnector(es_conn=es, es_index=out_index,
+                                    contribs_field=contribs_field,
+                                    timeframe_field=timeframe_field,
+                                    sort_on_field=sort_on_field,
+                                    read_only=False)
+
+        onion.delete_quarters(es, out_index, quarters)
+        onion_study(in_conn=in_conn, out_conn=out_conn, data_source=data_source)
+        onion.write_checkpoint(es, out_index, es_major, run_date, quarters)
+
+        logger.info("{} end".format(log_prefix))
+
+    def enrich_survey_rollups(self, ocean_backend, enrich_backend,
+                              out_index="surveyqq_rollups", no_incremental=False):
+        """Keep an index with daily rollups of the survey answers.
+
+        Rollup items count, per day and project, the answers, their scores,
+        their NPS categories and the reasons selected, for all the answers
+        and split by issue label and milestone (see `SurveyRollups`). Only
+        the days with answers enriched after the previous run are computed
+        again, unless `no_incremental` is set.
+
+        Entry example in setup.cfg :
+
+        [surveyqq]
+        ...
+        studies = [enrich_survey_rollups]
+
+        [enrich_survey_rollups]
+        out_index = surveyqq_rollups
+        """
+        log_prefix = "[surveyqq] study rollups"
+
+        in_index = enrich_backend.elastic.index
+        es = ES([enrich_backend.elastic.url], retry_on_timeout=True, timeout=100,
+                verify_certs=self.elastic.requests.verify, connection_class=RequestsHttpConnection)
+
+        es_out = ElasticSearch(enrich_backend.elastic.url, out_index,
+                               mappings=rollups.Mapping, clean=no_incremental)
+
+        last_date = None if no_incremental else es_out.get_last_date('metadata__enriched_on')
+        run_date = datetime_utcnow().isoformat()
+
+        days = rollups.get_touched_days(es, in_index, last_date)
+        if not days:
+            logger.info("{} no new items".format(log_prefix))
+            return
+
+        logger.info("{} computing {} days, from {} to {}".format(log_prefix, len(days), days[0], days[-1]))
+
+        survey_rollups = rollups.compute_rollups(es, in_index, days)
+        if last_date:
+            rollups.delete_days(es, out_index, days)
+
+        items = list(survey_rollups.get_items(run_date))
+        inserted = es_out.bulk_upload(items, "uuid")
+
+        logger.info("{} end, {}/{} items written".format(log_prefix, inserted, len(items)))
+
+    def enrich_open_issues_age(self, ocean_backend, enrich_backend, reference_date=None):
+        """Refresh the age of the open issues in the enriched index.
+
+        `issue_time_open_days` of the answers about open or progressing
+        issues is computed again from a single reference date and written
+        with partial updates, without reading the raw items. Answers
+        enriched before `issue_state` was stored are not refreshed.
+
+        Entry example in setup.cfg :
+
+        [surveyqq]
+        ...
+        studies = [enrich_open_issues_age]
+
+        [enrich_open_issues_age]
+        reference_date = 2021-06-30
+        """
+        log_prefix = "[surveyqq] study open issues age"
+
+        if reference_date:
+            now = parse_date(reference_date)
+        else:
+            now = self.get_reference_date()
+
+        es = ES([enrich_backend.elastic.url], retry_on_timeout=True, timeout=100,
+                verify_certs=self.elastic.requests.verify, connection_class=RequestsHttpConnection)
+
+        logger.info("{} starting with reference date {}".format(log_prefix, now.isoformat()))
+
+        read, updated = ages.refresh_open_days(es, enrich_backend.elastic.index,
+                                               enrich_backend.elastic.major,
+                                               datetime_to_epoch(now),
+                                               chunk_size=enrich_backend.elastic.max_items_bulk)
+
+        logger.info("{} end, {}/{} items updated".format(log_prefix, updated, read))
+
+    def enrich_issue_timeline(self, ocean_backend, enrich_backend,
+                              out_index="surveyqq_issue_timeline", no_incremental=False):
+        """Keep an index with the responsiveness timeline of the surveyed issues.
+
+        Each item of the index is an issue, with the time to the first
+        reply of a person other than the author, the time to the first
+        bot reply, the median gap between comments and the number of
+        distinct responders (see `timeline.get_timeline_item`). Only the
+        issues in answers collected after the previous run are computed
+        again, unless `no_incremental` is set.
+
+        Entry example in setup.cfg :
+
+        [surveyqq]
+        ...
+        studies = [enrich_issue_timeline]
+
+        [enrich_issue_timeline]
+        out_index = surveyqq_issue_timeline
+        """
+        log_prefix = "[surveyqq] study issue timeline"
+
+        es = ES([ocean_backend.elastic.url], retry_on_timeout=True, timeout=100,
+                verify_certs=self.elastic.requests.verify, connection_class=RequestsHttpConnection)
+
+        es_out = ElasticSearch(enrich_backend.elastic.url, out_index,
+                               mappings=timeline.Mapping, clean=no_incremental)
+
+        last_date = None if no_incremental else es_out.get_last_date('metadata__enriched_on')
+        run_date = datetime_utcnow().isoformat()
+
+        items = timeline.get_issue_timelines(es, ocean_backend.elastic.index, last_date, self.bots)
+        if not items:
+            logger.info("{} no new items".format(log_prefix))
+            return
+
+        for item in items:
+            item['metadata__enriched_on'] = run_date
+        inserted = es_out.bulk_upload(items, "uuid")
+
+        logger.info("{} end, {}/{} issues written".format(log_prefix, inserted, len(items)))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import hashlib
+import logging
+
+from elasticsearch import helpers
+
+from grimoire_elk.elastic_mapping import Mapping as BaseMapping
+
+from .bots import DEFAULT_BOTS
+from .comments import CommentIndex
+from .dates import SECONDS_DAY, diff_days, str_to_epoch
+from .issues import IssueMetricsCache
+
+
+TIMELINE_SOURCE_FIELDS = ['origin', 'project', 'data.issue_data', 'data.comment_data']
+
+logger = logging.getLogger(__name__)
+
+
+class Mapping(BaseMapping):
+
+    @staticmethod
+    def get_elastic_mappings(es_major):
+        """Get Elasticsearch mapping.
+        :param es_major: major version of Elasticsearch, as string
+        :returns:        dictionary with a key, 'items', with the mapping
+        """
+
+        mapping = """
+        {
+            "dynamic": false,
+            "properties": {
+                "uuid": {"type": "keyword"},
+                "origin": {"type": "keyword"},
+                "project": {"type": "keyword"},
+                "issue_url": {"type": "keyword"},
+                "issue_state": {"type": "keyword"},
+                "grimoire_creation_date": {"type": "date"},
+                "issue_updated_at": {"type": "date"},
+                "comments": {"type": "long"},
+                "responders": {"type": "long"},
+                "time_to_first_reply_days": {"type": "float"},
+                "time_to_first_bot_reply_days": {"type": "float"},
+                "median_reply_gap_days": {"type": "float"},
+                "metadata__enriched_on": {"type": "date"}
+            }
+        }
+        """
+
+        return {"items": mapping}
+
+
+def get_timeline_item(issue, comments, origin=None, project=None, bots=DEFAULT_BOTS):
+    """Get the responsiveness timeline of an issue.
+
+    :param issue: issue data, as in `issue_data` of a raw item
+    :param comments: comments of the issue, as in `comment_data`
+    :param origin: origin of the raw item the issue was read from
+    :param project: project of that raw item, if any
+    :param bots: `BotDetector` telling which commenters are bots
+    :returns: dict with the timeline fields
+    """
+    index = CommentIndex(issue, comments, bots)
+    created_at = str_to_epoch(issue['created_at'])
+    median_gap = index.get_median_gap(created_at)
+    issue_url = issue.get('html_url') or issue.get('url') or str(issue.get('id'))
+
+    return {
+        'uuid': hashlib.sha1(issue_url.encode('utf-8')).hexdigest(),
+        'origin': origin,
+        'project': project,
+        'issue_url': issue_url,
+        'issue_state': issue.get('state'),
+        'grimoire_creation_date': issue['created_at'],
+        'issue_updated_at': issue.get('updated_at'),
+        'comments': len(index.timestamps),
+        'responders': len(index.responders),
+        'time_to_first_reply_days': diff_days(created_at, index.first_attention_ts),
+        'time_to_first_bot_reply_days': diff_days(created_at, index.first_bot_ts),
+        'median_reply_gap_days': float('%.2f' % (median_gap / SECONDS_DAY)) if median_gap is not None else None
+    }
+
+
+def get_issue_timelines(es, raw_index, since=None, bots=DEFAULT_BOTS):
+    """Compute the timeline of the issues in the answers of a raw index.
+
+    Raw items are read with a single scroll. Answers about the same
+    issue share its timeline, computed from the latest version of the
+    issue; only the timeline items are kept in memory.
+
+    :param es: Elasticsearch client
+    :param raw_index: raw index to read
+    :param since: datetime; only issues in answers collected after it are read
+    :param bots: `BotDetector` telling which commenters are bots
+    :returns: list of timeline items
+    """
+    query = {"_source": TIMELINE_SOURCE_FIELDS}
+    if since:
+        query["query"] = {"range": {"metadata__timestamp": {"gt": since.isoformat()}}}
+
+    latest = {}
+    for hit in helpers.scan(es, query=query, index=raw_index):
+        source = hit['_source']
+        issue = source['data'].get('issue_data')
+        if not isinstance(issue, dict):
+            continue
+
+        key = IssueMetricsCache.get_key(issue)
+        if key is None:
+            continue
+        issue_id, updated_at = key
+        updated_at = str_to_epoch(updated_at) or 0
+        if issue_id in latest and latest[issue_id][0] >= updated_at:
+            continue
+
+        timeline = get_timeline_item(issue, source['data'].get('comment_data') or [],
+                                     source.get('origin'), source.get('project'), bots)
+        latest[issue_id] = (updated_at, timeline)
+
+    return [timeline for _, timeline in latest.values()]
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import json
+import logging
+
+from grimoirelab_toolkit.datetime import InvalidDateError
+
+from grimoire_elk.elastic_mapping import Mapping as BaseMapping
+
+from .ages import is_open
+from .dates import str_to_epoch
+from .questionnaire import OPTIONS
+
+
+# Messages stored in issue_data instead of the issue when the link is wrong
+INVALID_ISSUE_MESSAGES = ["Invalid Issue Link", "Can't get message about Issue"]
+ISSUE_REQUIRED_FIELDS = ['state', 'created_at', 'user', 'assignee', 'labels', 'milestone']
+
+logger = logging.getLogger(__name__)
+
+
+class Mapping(BaseMapping):
+
+    @staticmethod
+    def get_elastic_mappings(es_major):
+        """Get Elasticsearch mapping.
+        :param es_major: major version of Elasticsearch, as string
+        :returns:        dictionary with a key, 'items', with the mapping
+        """
+
+        mapping = """
+        {
+            "dynamic": false,
+            "properties": {
+                "uuid": {"type": "keyword"},
+                "origin": {"type": "keyword"},
+                "reasons": {"type": "keyword"},
+                "raw_item": {"type": "text", "index": false},
+                "metadata__quarantined_on": {"type": "date"}
+            }
+        }
+        """
+
+        return {"items": mapping}
+
+
+def _check_answer(data, layouts, origin):
+    answers = data.get('answer')
+    if not isinstance(answers, list) or not answers:
+        return ["missing answer"]
+
+    answer = answers[0]
+    if not isinstance(answer, dict) or not isinstance(answer.get('questions'), list):
+        return ["missing questions"]
+
+    reasons = []
+    for field, kind, question in layouts.locate(answer, origin):
+        if question is None:
+            reasons.append("missing question for {}".format(field))
+        elif kind == OPTIONS:
+            options = question.get('options')
+            if not isinstance(options, list) or not all(isinstance(op, dict) and 'text' in op for op in options):
+                reasons.append("wrong options for {}".format(field))
+        elif 'text' not in question:
+            reasons.append("missing text for {}".format(field))
+        elif field == 'survey_score':
+            try:
+                score = int(question['text'])
+            except (TypeError, ValueError):
+                reasons.append("score is not a number")
+            else:
+                if not 0 <= score <= 10:
+                    reasons.append("score out of range")
+
+    return reasons
+
+
+def _is_date(value):
+    try:
+        return str_to_epoch(value) is not None
+    except (InvalidDateError, TypeError, ValueError, AttributeError):
+        return False
+
+
+def _is_user(user):
+    return isinstance(user, dict) and 'login' in user and 'name' in user
+
+
+def _check_issue(data):
+    issue = data.get('issue_data')
+    if issue in INVALID_ISSUE_MESSAGES:
+        return []
+    if not isinstance(issue, dict):
+        return ["wrong issue_data"]
+
+    reasons = ["missing issue {}".format(field) for field in ISSUE_REQUIRED_FIELDS if field not in issue]
+    if reasons:
+        return reasons
+
+    if not _is_date(issue['created_at']):
+        reasons.append("wrong issue created_at date")
+    if not is_open(issue) and not _is_date(issue.get('finished_at')):
+        reasons.append("wrong issue finished_at date")
+    if not _is_user(issue['user']):
+        reasons.append("wrong issue user")
+    if not isinstance(issue['labels'], list) or not all(isinstance(label, dict) and 'name' in label
+                                                         for label in issue['labels']):
+        reasons.append("wrong issue labels")
+    if issue['milestone'] and not (isinstance(issue['milestone'], dict) and 'title' in issue['milestone']):
+        reasons.append("wrong issue milestone")
+
+    comments = data.get('comment_data')
+    if not isinstance(comments, list):
+        reasons.append("wrong comment_data")
+    elif not all(isinstance(comment, dict) and _is_user(comment.get('user')) and _is_date(comment.get('created_at'))
+                 for comment in comments):
+        reasons.append("wrong comment in comment_data")
+
+    return reasons
+
+
+def validate_item(item, layouts):
+    """Check that a raw item has the fields read by the enricher.
+
+    Checks are cheap: the presence and type of every field read by the
+    enricher, the score and the dates are verified. Errors raised while
+    checking are returned as reasons, so a malformed item never stops
+    the validation of its block.
+
+    :param item: raw item
+    :param layouts: `QuestionnaireLayouts` used to read the answers
+    :returns: list with the reasons the item is not valid, empty if valid
+    """
+    try:
+        return _validate_item(item, layouts)
+    except Exception as exc:
+        return ["validation error {}: {}".format(type(exc).__name__, exc)]
+
+
+def _validate_item(item, layouts):
+    if not isinstance(item, dict):
+        return ["wrong item"]
+    if item.get('category') != 'issue':
+        return ["unknown category {}".format(item.get('category'))]
+    if not item.get('uuid'):
+        return ["missing uuid"]
+
+    data = item.get('data')
+    if not isinstance(data, dict):
+        return ["missing data"]
+
+    reasons = _check_answer(data, layouts, item.get('origin'))
+    reasons.extend(_check_issue(data))
+
+    if not _is_date(data.get('started_at')):
+        reasons.append("wrong started_at date")
+
+    return reasons
+
+
+def get_quarantine_item(item, reasons, quarantined_on):
+    """Get the item stored in the quarantine index for a malformed raw item"""
+
+    return {
+        'uuid': item.get('uuid'),
+        'origin': item.get('origin'),
+        'reasons': reasons,
+        'raw_item': json.dumps(item),
+        'metadata__quarantined_on': quarantined_on
+    }
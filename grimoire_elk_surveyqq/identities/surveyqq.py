@@ -21,12 +21,49 @@
 
 from grimoire_elk.identities.identities import Identities
 
+from ..enriched.bots import DEFAULT_BOTS, BotDetector
+from ..enriched.questionnaire import QuestionnaireLayouts
+
+
+# Survey fields with personal data of the respondent
+ANSWER_IDENTITY_FIELDS = ['user_login', 'user_email']
+
 
 class SurveyqqIdentities(Identities):
 
+    layouts = QuestionnaireLayouts()
+    bots = DEFAULT_BOTS
+
+    @classmethod
+    def set_survey_titles(cls, titles, question_ids=None):
+        """Locate the respondent fields of the answers by the title or id of their questions"""
+
+        cls.layouts = QuestionnaireLayouts(titles, question_ids)
+
     @classmethod
-    def anonymize_item(cls, item):
+    def set_bots(cls, bots):
+        """Set how the users of the issues are classified as bots before hashing them.
+
+        :param bots: a `BotDetector`, or the path of a JSON file with
+            the `logins`, `suffixes` and `patterns` of the bots
+        """
+        if isinstance(bots, str):
+            bots = BotDetector.from_file(bots)
+        cls.bots = bots
+
+    @classmethod
+    def anonymize_item(cls, item, memo=None):
+        """Anonymize the identities of an item.
+
+        :param item: raw item, anonymized in place
+        :param memo: dict with the hashes already computed, shared
+            by the items anonymized in the same run
+        """
+        if memo is None:
+            memo = {}
+
         category = item['category']
+        origin = item.get('origin')
 
         item = item['data']
         comments_attr = None
@@ -48,12 +85,13 @@ class SurveyqqIdentities(Identities):
             identity_attr = identity + "_data"
 
             item[identity] = {
-                'login': cls._hash(item[identity]['login'])
+                'login': cls.__hash(item[identity]['login'], memo)
             }
 
+            login = cls.__hash(item[identity_attr]['login'], memo)
             item[identity_attr] = {
-                'name': cls._hash(item[identity_attr]['login']),
-                'login': cls._hash(item[identity_attr]['login']),
+                'name': login,
+                'login': login,
                 'email': None,
                 'company': None,
                 'location': None,
@@ -63,16 +101,73 @@ class SurveyqqIdentities(Identities):
         for comment in comments:
             if 'user' in comment and comment['user']:
                 comment['user'] = {
-                    'login': cls._hash(comment['user']['login'])
+                    'login': cls.__hash(comment['user']['login'], memo)
                 }
+            login = cls.__hash(comment['user_data']['login'], memo)
             comment['user_data'] = {
-                'name': cls._hash(comment['user_data']['login']),
-                'login': cls._hash(comment['user_data']['login']),
+                'name': login,
+                'login': login,
                 'email': None,
                 'company': None,
                 'location': None,
             }
             for reaction in comment['reactions_data']:
                 reaction['user'] = {
-                    'login': cls._hash(reaction['user']['login'])
-                }
\ No newline at end of file
+                    'login': cls.__hash(reaction['user']['login'], memo)
+                }
+
+        if 'answer' in item:
+            cls.__anonymize_survey(item, origin, memo)
+
+    @classmethod
+    def anonymize_items(cls, items):
+        """Anonymize a batch of items, hashing each login and email once.
+
+        :param items: iterable of raw items
+        :returns: generator of the items, anonymized in place
+        """
+        memo = {}
+        for item in items:
+            cls.anonymize_item(item, memo)
+            yield item
+
+    @classmethod
+    def __anonymize_survey(cls, data, origin, memo):
+        """Anonymize the respondent of a survey answer and the users of its issue.
+
+        Users of the issue and the respondent are hashed the same way, so
+        the role of the respondent in the issue can still be computed.
+        Hashed names do not tell bots apart, so users of the issue are
+        classified before hashing them and keep the verdict in `bot`.
+        """
+        for answer in data['answer']:
+            for field, _, question in cls.layouts.locate(answer, origin):
+                if field in ANSWER_IDENTITY_FIELDS and question and question['text']:
+                    question['text'] = cls.__hash(question['text'], memo)
+
+        issue = data.get('issue_data')
+        # Answers with a wrong issue link have a message instead of the issue
+        if isinstance(issue, dict):
+            for identity in ['user', 'assignee']:
+                if issue.get(identity):
+                    issue[identity] = cls.__hash_user(issue[identity], memo)
+
+        for comment in data.get('comment_data', []):
+            if comment.get('user'):
+                comment['user'] = cls.__hash_user(comment['user'], memo)
+
+    @classmethod
+    def __hash_user(cls, user, memo):
+        return {
+            'login': cls.__hash(user['login'], memo),
+            'name': cls.__hash(user.get('name') or user['login'], memo),
+            'bot': cls.bots.is_bot(user)
+        }
+
+    @classmethod
+    def __hash(cls, name, memo):
+        hashed = memo.get(name)
+        if hashed is None:
+            hashed = cls._hash(name)
+            memo[name] = hashed
+        return hashed
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import bisect
+import json
+import logging
+import os
+import time
+
+from collections import defaultdict
+from contextlib import nullcontext
+
+from . import config
+
+
+# Upper limits, in seconds, of the buckets of the stage histograms
+STAGE_BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Stage returned when the metrics are disabled
+NULL_STAGE = nullcontext()
+
+logger = logging.getLogger(__name__)
+
+# Metrics shared by the backends configured from the environment
+_environ_metrics = None
+
+
+class Stage:
+    """Context manager timing a stage and counting its errors"""
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        if exc_type:
+            self.metrics.errors[self.name] += 1
+        return False
+
+
+class Metrics:
+    """Timing histograms and counters of the stages of the backends.
+
+    Stages are timed with `stage`; when the metrics are disabled it
+    returns a shared no-op context manager, so the instrumentation costs
+    one method call per stage. Metrics are exported as a Prometheus text
+    file, for the node exporter textfile collector, and as a JSON log line.
+
+    :param enabled: collect the metrics
+    :param textfile: Prometheus text file written on each report
+    :param log_interval: minimum number of seconds between the log lines
+        of `maybe_report`; if None, only `report` writes them
+    """
+    def __init__(self, enabled=False, textfile=None, log_interval=None):
+        self.enabled = enabled
+        self.textfile = textfile
+        self.log_interval = log_interval
+        self.last_report = time.monotonic()
+
+        self.buckets = defaultdict(lambda: [0] * (len(STAGE_BUCKETS) + 1))
+        self.sums = defaultdict(float)
+        self.errors = defaultdict(int)
+        self.counters = defaultdict(int)
+
+    def stage(self, name):
+        """Get a context manager timing the stage `name`"""
+
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name)
+
+    def observe(self, name, seconds):
+        """Add a duration to the histogram of a stage"""
+
+        self.buckets[name][bisect.bisect_left(STAGE_BUCKETS, seconds)] += 1
+        self.sums[name] += seconds
+
+    def inc(self, name, value=1):
+        """Increase the counter `name`"""
+
+        if self.enabled:
+            self.counters[name] += value
+
+    def get_prometheus(self):
+        """Get the metrics in the Prometheus text format"""
+
+        lines = [
+            "# HELP surveyqq_stage_seconds Time spent in each stage of the surveyqq backends.",
+            "# TYPE surveyqq_stage_seconds histogram"
+        ]
+        for name in sorted(self.buckets):
+            cumulative = 0
+            for limit, count in zip(STAGE_BUCKETS + ('+Inf',), self.buckets[name]):
+                cumulative += count
+                lines.append('surveyqq_stage_seconds_bucket{{stage="{}",le="{}"}} {}'.format(name, limit, cumulative))
+            lines.append('surveyqq_stage_seconds_sum{{stage="{}"}} {}'.format(name, self.sums[name]))
+            lines.append('surveyqq_stage_seconds_count{{stage="{}"}} {}'.format(name, cumulative))
+
+        lines.append("# HELP surveyqq_stage_errors_total Errors raised in each stage of the surveyqq backends.")
+        lines.append("# TYPE surveyqq_stage_errors_total counter")
+        for name in sorted(self.errors):
+            lines.append('surveyqq_stage_errors_total{{stage="{}"}} {}'.format(name, self.errors[name]))
+
+        for name in sorted(self.counters):
+            lines.append("# TYPE surveyqq_{}_total counter".format(name))
+            lines.append("surveyqq_{}_total {}".format(name, self.counters[name]))
+
+        return "\n".join(lines) + "\n"
+
+    def get_summary(self):
+        """Get a dict with the count, total and mean time of each stage, and the counters"""
+
+        stages = {}
+        for name in self.buckets:
+            count = sum(self.buckets[name])
+            stages[name] = {
+                'count': count,
+                'seconds': round(self.sums[name], 6),
+                'mean': round(self.sums[name] / count, 6) if count else None,
+                'errors': self.errors.get(name, 0)
+            }
+
+        return {'stages': stages, 'counters': dict(self.counters)}
+
+    def report(self):
+        """Write the Prometheus text file, if any, and a log line with the summary"""
+
+        if not self.enabled:
+            return
+
+        self.last_report = time.monotonic()
+        logger.info("[surveyqq] metrics {}".format(json.dumps(self.get_summary(), sort_keys=True)))
+
+        if not self.textfile:
+            return
+
+        tmp_path = self.textfile + '.tmp'
+        with open(tmp_path, 'w') as fd:
+            fd.write(self.get_prometheus())
+        os.replace(tmp_path, self.textfile)
+
+    def maybe_report(self):
+        """Report the metrics if `log_interval` seconds passed since the last report"""
+
+        if not self.enabled or self.log_interval is None:
+            return
+        if time.monotonic() - self.last_report >= self.log_interval:
+            self.report()
+
+
+def get_environ_metrics(environ=None):
+    """Get the metrics enabled in the environment, or None if they are not enabled.
+
+    `SURVEYQQ_METRICS` enables the metrics, `SURVEYQQ_METRICS_TEXTFILE`
+    sets their Prometheus text file and `SURVEYQQ_METRICS_INTERVAL` the
+    seconds between their log lines. The same object is returned to all
+    the backends of a process, so their stages are reported together.
+
+    :param environ: dict of environment variables; `os.environ` by default
+    """
+    global _environ_metrics
+
+    if not config.get_bool_option('metrics', environ):
+        return None
+
+    if _environ_metrics is None:
+        _environ_metrics = Metrics(enabled=True,
+                                   textfile=config.get_option('metrics_textfile', environ),
+                                   log_interval=config.get_int_option('metrics_interval', environ))
+    return _environ_metrics
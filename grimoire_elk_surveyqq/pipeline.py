@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import logging
+
+from .bulk import BulkBuffer
+
+
+MAX_INFLIGHT_BYTES = 32 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def stream_items(ocean_backend, enrich_backend, items, max_inflight_bytes=MAX_INFLIGHT_BYTES):
+    """Feed raw items to the raw and the enriched indexes in a single pass.
+
+    Each item is fixed and stored in the raw index buffer as soon as it is
+    read from `items`. Items are then validated and enriched in blocks of
+    `max_items_bulk` items: the respondents of a block not known yet are
+    registered in SortingHat, as `load_identities` does in the usual flow,
+    and then the valid items are enriched and stored in the enriched index
+    buffer. Malformed items are stored in the raw index and in the buffer
+    of the quarantine index, if any, but not enriched. Without enricher,
+    items are only stored in the raw index. Logins and emails of the
+    anonymized items are hashed once per call.
+    Buffers are uploaded synchronously when they are full, so the source
+    is not consumed while a bulk request is in progress and the pending
+    documents never take more than `max_inflight_bytes`, plus the block
+    being enriched.
+
+    :param ocean_backend: `SurveyqqOcean` of the raw index
+    :param enrich_backend: `SurveyqqEnrich` of the enriched index, or None
+    :param items: iterator of Perceval items
+    :param max_inflight_bytes: bytes budget shared by both buffers
+    :returns: tuple with the number of raw and enriched items inserted
+    """
+    if enrich_backend:
+        # The budget is shared by the raw, enriched and quarantine buffers
+        shares = 3 if enrich_backend.quarantine_index else 2
+        raw_buffer = BulkBuffer(ocean_backend.elastic, max_inflight_bytes // shares)
+        rich_buffer = BulkBuffer(enrich_backend.elastic, max_inflight_bytes // shares)
+        quarantine_buffer = enrich_backend.get_quarantine_buffer(max_inflight_bytes // shares)
+        rich_field_id = enrich_backend.get_field_unique_id()
+        block_size = enrich_backend.elastic.max_items_bulk
+        buffers = [("raw", raw_buffer), ("enriched", rich_buffer)]
+        if quarantine_buffer:
+            buffers.append(("quarantine", quarantine_buffer))
+    else:
+        raw_buffer = BulkBuffer(ocean_backend.elastic, max_inflight_bytes)
+        rich_buffer = None
+        buffers = [("raw", raw_buffer)]
+
+    raw_field_id = ocean_backend.get_field_unique_id()
+    block = []
+    drop = 0
+    # Hashes of the logins and emails already anonymized
+    anonymized = {}
+
+    metrics = ocean_backend.metrics
+
+    for item in items:
+        ocean_backend.add_update_date(item)
+        ocean_backend._fix_item(item)
+        if ocean_backend.project:
+            item['project'] = ocean_backend.project
+        if ocean_backend.anonymize:
+            with metrics.stage('anonymize'):
+                ocean_backend.identities.anonymize_item(item, anonymized)
+        if ocean_backend.drop_item(item):
+            drop += 1
+            continue
+
+        with metrics.stage('raw_bulk'):
+            raw_buffer.add(item[raw_field_id], item)
+        metrics.inc('raw_items')
+        if enrich_backend:
+            block.append(item)
+        if block and len(block) >= block_size:
+            _enrich_block(enrich_backend, block, rich_buffer, quarantine_buffer, rich_field_id, metrics)
+            block = []
+
+        metrics.maybe_report()
+
+    if block:
+        _enrich_block(enrich_backend, block, rich_buffer, quarantine_buffer, rich_field_id, metrics)
+
+    for name, buffer in buffers:
+        buffer.flush()
+        metrics.inc('bulk_errors', buffer.total - buffer.inserted)
+        if buffer.total != buffer.inserted:
+            logger.warning("[surveyqq] {}/{} missing items in {} index".format(
+                           buffer.total - buffer.inserted, buffer.total, name))
+
+    logger.debug("[surveyqq] Dropped {} items using drop_item filter".format(drop))
+    metrics.inc('dropped_items', drop)
+
+    return raw_buffer.inserted, rich_buffer.inserted if rich_buffer else 0
+
+
+def _enrich_block(enrich_backend, items, rich_buffer, quarantine_buffer, field_id, metrics):
+    """Validate a block of items, register their new respondents in SortingHat,
+    enrich them and add them to the enriched index buffer"""
+
+    items = enrich_backend.validate_items(items, quarantine_buffer)
+    if not items:
+        return
+
+    if enrich_backend.sortinghat:
+        identities = [identity for item in items for identity in enrich_backend.get_identities(item)]
+        if identities:
+            with metrics.stage('sortinghat'):
+                enrich_backend.add_sh_identities(identities)
+
+    with metrics.stage('enrich'):
+        rich_items = enrich_backend.get_rich_items(items)
+    with metrics.stage('rich_bulk'):
+        for item, rich_item in zip(items, rich_items):
+            rich_buffer.add(item[field_id], rich_item)
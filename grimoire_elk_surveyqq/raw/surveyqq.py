@@ -22,9 +22,23 @@
 from grimoire_elk.raw.elastic import ElasticOcean
 from grimoire_elk.enriched.utils import get_repository_filter
 from grimoire_elk.elastic_mapping import Mapping as BaseMapping
+from .. import config
 from ..identities.surveyqq import SurveyqqIdentities
+from ..metrics import Metrics, get_environ_metrics
+from ..pipeline import MAX_INFLIGHT_BYTES, stream_items
 from grimoire_elk_surveyqq.enriched.surveyqq import GITEE
 import json
+import logging
+import sys
+
+
+# Fields of the issue and comments read by the enricher, kept in compact mode
+ISSUE_FIELDS = ['id', 'url', 'html_url', 'state', 'created_at', 'updated_at',
+                'finished_at', 'user', 'assignee', 'labels', 'milestone']
+COMMENT_FIELDS = ['created_at', 'user']
+USER_FIELDS = ['login', 'name']
+
+logger = logging.getLogger(__name__)
 
 
 class Mapping(BaseMapping):
@@ -57,6 +71,88 @@ class SurveyqqOcean(ElasticOcean):
     mapping = Mapping
     identities = SurveyqqIdentities
 
+    enrich_backend = None
+    max_inflight_bytes = MAX_INFLIGHT_BYTES
+    compact = False
+    metrics = Metrics()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.configure()
+
+    def configure(self, environ=None):
+        """Apply the options of the feeder set in the environment.
+
+        Options are read from `SURVEYQQ_<OPTION>` variables (see `config`)
+        and passed to the setter of each option:
+
+        - `SURVEYQQ_METRICS`: time the stages of the feeding, see
+          `get_environ_metrics` and `set_metrics`
+        - `SURVEYQQ_COMPACT`: store only the fields read by the enricher,
+          see `set_compact`
+        - `SURVEYQQ_BOTS`: JSON file with the bots, used to flag the bots
+          of anonymized items, see `SurveyqqIdentities.set_bots`
+
+        :param environ: dict of environment variables; `os.environ` by default
+        """
+        metrics = get_environ_metrics(environ)
+        if metrics:
+            self.set_metrics(metrics)
+
+        compact = config.get_bool_option('compact', environ)
+        if compact is not None:
+            self.set_compact(compact)
+
+        bots = config.get_option('bots', environ)
+        if bots:
+            self.identities.set_bots(bots)
+
+    def set_enrich_backend(self, enrich_backend, max_inflight_bytes=MAX_INFLIGHT_BYTES):
+        """Enrich the items while they are fed, instead of reading them
+        back from the raw index afterwards.
+
+        Mordred and p2o do not call this method, as they enrich the items
+        in a separate task; see the README for an example.
+
+        :param enrich_backend: `SurveyqqEnrich` with its elastic already set
+        :param max_inflight_bytes: bytes budget for the items pending upload
+        """
+        self.enrich_backend = enrich_backend
+        self.max_inflight_bytes = max_inflight_bytes
+
+    def set_compact(self, compact=True):
+        """Store only the issue and comment fields read by the enricher.
+
+        In compact mode `issue_data` and `comment_data` are trimmed to
+        `ISSUE_FIELDS` and `COMMENT_FIELDS`, users to `USER_FIELDS`, logins
+        are interned and the identity dicts added to the items do not
+        include the fields which are always None. The answers are kept
+        as they are.
+        """
+        self.compact = compact
+
+    def set_metrics(self, metrics):
+        """Time the stages of the feeding with a `Metrics` object.
+
+        The same object can be set in the enricher, so the stages of
+        both backends are reported together.
+        """
+        self.metrics = metrics
+
+    def feed_items(self, items):
+        """Store the items in the raw index, and enrich them if there is an enrich backend.
+
+        Items are stored by `stream_items`, which fixes, anonymizes and
+        filters them as `ElasticOcean.feed_items` does, but hashes each
+        login and email once per run.
+        """
+        raw, rich = stream_items(self, self.enrich_backend, items, self.max_inflight_bytes)
+        logger.debug("[surveyqq] Added {} raw and {} enriched items".format(raw, rich))
+        self.metrics.report()
+
+        return self
+
     @classmethod
     def get_perceval_params_from_url(cls, url):
         """ Get the perceval params given a URL for the data source """
@@ -70,8 +166,15 @@ class SurveyqqOcean(ElasticOcean):
         return params
 
     def _fix_item(self, item):
+        with self.metrics.stage('fix_item'):
+            self.__fix_item(item)
+
+    def __fix_item(self, item):
         category = item['category']
 
+        if self.compact:
+            self.__compact_item(item['data'])
+
         if 'classified_fields_filtered' not in item or not item['classified_fields_filtered']:
             return
 
@@ -94,20 +197,55 @@ class SurveyqqOcean(ElasticOcean):
 
             identity_attr = identity + "_data"
 
-            item[identity_attr] = {
-                'name': item[identity]['login'],
-                'login': item[identity]['login'],
-                'email': None,
-                'company': None,
-                'location': None,
-            }
+            item[identity_attr] = self.__get_user_data(item[identity]['login'])
 
         comments = item.get(comments_attr, [])
         for comment in comments:
-            comment['user_data'] = {
-                'name': comment['user']['login'],
-                'login': comment['user']['login'],
-                'email': None,
-                'company': None,
-                'location': None,
+            comment['user_data'] = self.__get_user_data(comment['user']['login'])
+
+    def __get_user_data(self, login):
+        if self.compact:
+            login = sys.intern(login)
+            return {
+                'name': login,
+                'login': login
             }
+
+        return {
+            'name': login,
+            'login': login,
+            'email': None,
+            'company': None,
+            'location': None,
+        }
+
+    @staticmethod
+    def __compact_user(user):
+        if not user:
+            return user
+
+        user = {field: user.get(field) for field in USER_FIELDS}
+        if user['login']:
+            user['login'] = sys.intern(user['login'])
+        return user
+
+    def __compact_item(self, data):
+        issue = data.get('issue_data')
+        # Answers with a wrong issue link have a message instead of the issue
+        if isinstance(issue, dict):
+            compact_issue = {field: issue[field] for field in ISSUE_FIELDS if field in issue}
+            compact_issue['user'] = self.__compact_user(issue.get('user'))
+            if issue.get('labels'):
+                compact_issue['labels'] = [{'name': label['name']} for label in issue['labels']]
+            if issue.get('milestone'):
+                compact_issue['milestone'] = {'title': issue['milestone']['title']}
+            data['issue_data'] = compact_issue
+
+        comments = data.get('comment_data')
+        if comments:
+            compact_comments = []
+            for comment in comments:
+                compact_comment = {field: comment[field] for field in COMMENT_FIELDS if field in comment}
+                compact_comment['user'] = self.__compact_user(comment.get('user'))
+                compact_comments.append(compact_comment)
+            data['comment_data'] = compact_comments
@@ -19,17 +19,78 @@
 #   Yehui Wang <yehui.wang.mdh@gmail.com>
 #
 
-# Connectors for Perceval
-from perceval.backends.surveyqq.surveyqq import Surveyqq, SurveyqqCommand
-# Connectors for EnrichOcean
-from .enriched.surveyqq import SurveyqqEnrich
-# Connectors for Ocean
-from .raw.surveyqq import SurveyqqOcean
+import importlib
+import logging
+import time
 
 
-def get_connectors():
+logger = logging.getLogger(__name__)
+
+# Seconds taken to import each connector module
+IMPORT_TIMES = {}
+
+
+class LazyConnector:
+    """Connector class imported the first time it is used.
+
+    Calling the connector, reading its attributes or checking instances
+    against it imports its module; until then, loading the plugin does
+    not import Perceval nor grimoire_elk. Connectors are compared and
+    hashed by the module and name of their class, which does not import
+    the module either.
+
+    :param module: name of the module defining the class
+    :param name: name of the class
+    """
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+        self._cls = None
+        self.__module__ = module
+        self.__name__ = name
+        self.__qualname__ = name
+
+    def resolve(self):
+        """Import the connector class"""
+
+        if self._cls is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._module)
+            IMPORT_TIMES.setdefault(self._module, time.perf_counter() - start)
+            logger.debug("[surveyqq] {} imported in {:.1f} ms".format(
+                         self._module, IMPORT_TIMES[self._module] * 1000))
+            self._cls = getattr(module, self._name)
+        return self._cls
 
-    return {"surveyqq": [Surveyqq, SurveyqqOcean, SurveyqqEnrich, SurveyqqCommand]}
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
 
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyConnector):
+            return (self._module, self._name) == (other._module, other._name)
+        if not isinstance(other, type):
+            return NotImplemented
+        return (self._module, self._name) == (other.__module__, other.__qualname__)
+
+    def __hash__(self):
+        return hash((self._module, self._name))
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self.resolve())
+
+    def __subclasscheck__(self, subclass):
+        return issubclass(subclass, self.resolve())
+
+    def __repr__(self):
+        return "<LazyConnector {}.{}>".format(self._module, self._name)
+
+
+def get_connectors():
 
-    
+    return {"surveyqq": [LazyConnector('perceval.backends.surveyqq.surveyqq', 'Surveyqq'),
+                         LazyConnector('grimoire_elk_surveyqq.raw.surveyqq', 'SurveyqqOcean'),
+                         LazyConnector('grimoire_elk_surveyqq.enriched.surveyqq', 'SurveyqqEnrich'),
+                         LazyConnector('perceval.backends.surveyqq.surveyqq', 'SurveyqqCommand')]}
@@ -48,17 +48,18 @@ setup(name="grimoire-elk-surveyqq",
           'Topic :: Software Development',
           'License :: OSI Approved :: GNU General Public License v3 or later (GPLv3+)',
           'Programming Language :: Python :: 3',
-          'Programming Language :: Python :: 3.4',
-          'Programming Language :: Python :: 3.5'],
+          'Programming Language :: Python :: 3.7',
+          'Programming Language :: Python :: 3.8'],
       keywords="development repositories analytics for surveyqq",
       packages=['grimoire_elk_surveyqq', 'grimoire_elk_surveyqq.enriched', 'grimoire_elk_surveyqq.raw', 'grimoire_elk_surveyqq.identities'],
       entry_points={"grimoire_elk": "surveyqq = grimoire_elk_surveyqq.utils:get_connectors"},
       package_dir={'grimoire_elk_surveyqq.enriched': 'grimoire_elk_surveyqq/enriched'},
       package_data={'grimoire_elk_surveyqq.enriched': ['mappings/*.json']},
-      python_requires='>=3.4',
+      python_requires='>=3.7',
       setup_requires=['wheel'],
       extras_require={'sortinghat': ['sortinghat'],
-                      'mysql': ['PyMySQL']},
+                      'mysql': ['PyMySQL'],
+                      'parquet': ['pyarrow']},
       tests_require=['httpretty==0.8.6'],
       test_suite='tests',
       install_requires=[
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import json
+import os
+import tempfile
+import unittest
+
+from grimoire_elk_surveyqq.enriched.bots import BotDetector
+
+
+class TestBotDetector(unittest.TestCase):
+    """Classification of users into bots and people"""
+
+    def test_default_suffix(self):
+        bots = BotDetector()
+
+        self.assertTrue(bots.is_bot({'login': 'ci-bot', 'name': 'CI'}))
+        self.assertTrue(bots.is_bot({'login': 'ci', 'name': 'openeuler-bot'}))
+        self.assertFalse(bots.is_bot({'login': 'robot', 'name': 'Robot'}))
+        self.assertFalse(bots.is_bot({'login': 'jdoe'}))
+
+    def test_logins_and_patterns(self):
+        bots = BotDetector(logins=['jenkins'], suffixes=[], patterns=[r'^auto-\d+$'])
+
+        self.assertTrue(bots.is_bot({'login': 'jenkins'}))
+        self.assertTrue(bots.is_bot({'login': 'auto-42'}))
+        self.assertFalse(bots.is_bot({'login': 'auto-x'}))
+        self.assertFalse(bots.is_bot({'login': 'ci-bot'}))
+
+    def test_inline_flags(self):
+        """Patterns are compiled on their own, keeping their inline flags"""
+
+        bots = BotDetector(suffixes=[], patterns=[r'(?i)^jenkins', r'-ci$'])
+
+        self.assertTrue(bots.is_bot({'login': 'JENKINS-1'}))
+        self.assertTrue(bots.is_bot({'login': 'openeuler-ci'}))
+        self.assertFalse(bots.is_bot({'login': 'openeuler-CI'}))
+
+    def test_invalid_pattern(self):
+        with self.assertRaisesRegex(ValueError, 'Invalid bot pattern'):
+            BotDetector(patterns=['[a-'])
+
+    def test_bot_flag(self):
+        """Anonymized users keep the verdict given before hashing them"""
+
+        bots = BotDetector()
+
+        self.assertTrue(bots.is_bot({'login': '3f2a', 'name': '3f2a', 'bot': True}))
+        self.assertFalse(bots.is_bot({'login': 'ci-bot', 'bot': False}))
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'bots.json')
+            with open(path, 'w') as fd:
+                json.dump({'logins': ['jenkins'], 'patterns': ['mergebot']}, fd)
+            bots = BotDetector.from_file(path)
+
+        self.assertTrue(bots.is_bot({'login': 'jenkins'}))
+        self.assertTrue(bots.is_bot({'login': 'the-mergebot-2'}))
+        self.assertTrue(bots.is_bot({'login': 'ci-bot'}))
+
+    def test_verdicts_not_pickled(self):
+        bots = BotDetector()
+        bots.is_bot({'login': 'ci-bot'})
+
+        self.assertEqual(bots.__getstate__()['verdicts'], {})
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
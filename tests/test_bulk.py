@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import unittest
+
+from types import SimpleNamespace
+from unittest import mock
+
+from grimoire_elk_surveyqq.bulk import RETRIES_STATUS_FORCE_LIST, ConcurrentBulkBuffer, get_retries
+
+
+class OldRetry:
+    """Retry of urllib3 1.24, which names `allowed_methods` `method_whitelist`"""
+
+    def __init__(self, total=10, connect=None, read=None, redirect=None, status=None,
+                 method_whitelist=None, status_forcelist=None, backoff_factor=0,
+                 raise_on_redirect=True, raise_on_status=True):
+        self.method_whitelist = method_whitelist
+        self.status_forcelist = status_forcelist
+
+
+class MockedResponse:
+
+    def __init__(self, status_code, items=None):
+        self.status_code = status_code
+        self.items = items
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ValueError("HTTP error {}".format(self.status_code))
+
+    def json(self):
+        return {'items': self.items}
+
+
+def mocked_post(status_code=200):
+    """Mock of `Session.post`, recording the URLs requested"""
+
+    urls = []
+
+    def post(url, data=None, headers=None):
+        urls.append(url)
+        if url.endswith('/_refresh'):
+            return MockedResponse(200)
+        lines = data.decode('utf-8').splitlines()
+        return MockedResponse(status_code, [{'index': {'status': 201}} for _ in lines[::2]])
+
+    return post, urls
+
+
+def get_elastic():
+    return SimpleNamespace(get_bulk_url=lambda: 'http://localhost:9200/index/_bulk',
+                           index_url='http://localhost:9200/index',
+                           max_items_bulk=1000, requests=SimpleNamespace(verify=False))
+
+
+class TestConcurrentBulkBuffer(unittest.TestCase):
+    """Concurrent upload of bulk requests"""
+
+    def test_retries(self):
+        buffer = ConcurrentBulkBuffer(get_elastic(), concurrency=4)
+        try:
+            retries = buffer.session.get_adapter('http://localhost:9200').max_retries
+            self.assertEqual(retries.status_forcelist, RETRIES_STATUS_FORCE_LIST)
+            methods = getattr(retries, 'allowed_methods', getattr(retries, 'method_whitelist', None))
+            self.assertIs(methods, False)
+        finally:
+            buffer.executor.shutdown()
+            buffer.session.close()
+
+    def test_close(self):
+        """Documents are uploaded and the index is refreshed once"""
+
+        buffer = ConcurrentBulkBuffer(get_elastic(), concurrency=2, max_bytes=100, min_bytes=10)
+        post, urls = mocked_post()
+        buffer.session.post = post
+
+        for i in range(10):
+            buffer.add(str(i), {'value': 'x' * 50})
+
+        self.assertEqual(buffer.close(), 10)
+        self.assertEqual(buffer.total, 10)
+        self.assertEqual(urls.count('http://localhost:9200/index/_refresh'), 1)
+        self.assertEqual(urls[-1], 'http://localhost:9200/index/_refresh')
+
+    def test_batch_size(self):
+        """Batches are limited by their size in bytes, not by `max_items_bulk`"""
+
+        buffer = ConcurrentBulkBuffer(get_elastic(), concurrency=2)
+        post, urls = mocked_post()
+        buffer.session.post = post
+
+        for i in range(3000):
+            buffer.add(str(i), {'value': i})
+
+        self.assertEqual(len(buffer.actions), 3000)
+        self.assertEqual(buffer.close(), 3000)
+        self.assertEqual(urls, ['http://localhost:9200/index/_bulk', 'http://localhost:9200/index/_refresh'])
+
+    def test_close_error(self):
+        """A failed request is raised after releasing the pool and the session"""
+
+        buffer = ConcurrentBulkBuffer(get_elastic(), concurrency=2, max_bytes=100, min_bytes=10)
+        post, urls = mocked_post(status_code=400)
+        buffer.session.post = post
+        buffer.session.close = mock.Mock()
+
+        for i in range(5):
+            buffer.add(str(i), {'value': 'x' * 50})
+
+        with self.assertRaisesRegex(ValueError, 'HTTP error 400'):
+            buffer.close()
+
+        buffer.session.close.assert_called_once_with()
+        self.assertTrue(buffer.executor._shutdown)
+        self.assertNotIn('http://localhost:9200/index/_refresh', urls)
+
+    def test_old_retries(self):
+        """urllib3 1.24 is asked to retry every method with `method_whitelist`"""
+
+        retries = get_retries(OldRetry)
+
+        self.assertIs(retries.method_whitelist, False)
+        self.assertEqual(retries.status_forcelist, RETRIES_STATUS_FORCE_LIST)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
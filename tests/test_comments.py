@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import unittest
+
+from grimoire_elk_surveyqq.enriched.bots import BotDetector
+from grimoire_elk_surveyqq.enriched.comments import CommentIndex
+from grimoire_elk_surveyqq.enriched.dates import str_to_epoch
+
+
+def get_comment(login, created_at):
+    return {'user': {'login': login, 'name': login}, 'created_at': created_at}
+
+
+class TestCommentIndex(unittest.TestCase):
+    """Index of the comments of an issue"""
+
+    def setUp(self):
+        self.issue = {'user': {'login': 'author', 'name': 'Author'},
+                      'created_at': '2021-03-01T00:00:00+00:00'}
+        self.comments = [
+            get_comment('author', '2021-03-01T01:00:00+00:00'),
+            get_comment('ci-bot', '2021-03-01T02:00:00+00:00'),
+            get_comment('dev2', '2021-03-01T08:00:00+08:00'),
+            get_comment('dev1', '2021-03-01T03:00:00+00:00')
+        ]
+
+    def test_index(self):
+        index = CommentIndex(self.issue, self.comments)
+
+        self.assertEqual(index.logins, {'author', 'ci-bot', 'dev1', 'dev2'})
+        self.assertEqual(index.responders, {'dev1', 'dev2'})
+        self.assertEqual(index.first_bot_ts, str_to_epoch('2021-03-01T02:00:00+00:00'))
+        self.assertEqual(index.first_attention_ts, str_to_epoch('2021-03-01T00:00:00+00:00'))
+        self.assertEqual(index.first_attention.isoformat(), '2021-03-01T00:00:00+00:00')
+
+    def test_bots(self):
+        index = CommentIndex(self.issue, self.comments, bots=BotDetector(logins=['dev2']))
+
+        self.assertEqual(index.responders, {'dev1'})
+        self.assertEqual(index.first_bot_ts, str_to_epoch('2021-03-01T00:00:00+00:00'))
+        self.assertEqual(index.first_attention_ts, str_to_epoch('2021-03-01T03:00:00+00:00'))
+
+    def test_no_comments(self):
+        index = CommentIndex(self.issue, [])
+
+        self.assertIsNone(index.first_attention)
+        self.assertIsNone(index.first_bot_ts)
+        self.assertIsNone(index.get_median_gap(0))
+
+    def test_median_gap(self):
+        index = CommentIndex(self.issue, self.comments)
+        start = str_to_epoch(self.issue['created_at'])
+
+        # Gaps of 0, 1, 1 and 1 hours after sorting the comments
+        self.assertEqual(index.get_median_gap(start), 3600)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
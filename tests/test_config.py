@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import unittest
+
+from grimoire_elk_surveyqq.config import get_bool_option, get_int_option, get_option
+
+
+class TestConfig(unittest.TestCase):
+    """Options read from the environment"""
+
+    def test_option(self):
+        environ = {'SURVEYQQ_INDEX': ' quarantine ', 'SURVEYQQ_EMPTY': ''}
+
+        self.assertEqual(get_option('index', environ), 'quarantine')
+        self.assertIsNone(get_option('empty', environ))
+        self.assertIsNone(get_option('missing', environ))
+
+    def test_int_option(self):
+        self.assertEqual(get_int_option('workers', {'SURVEYQQ_WORKERS': '8'}), 8)
+        self.assertIsNone(get_int_option('workers', {}))
+        with self.assertRaisesRegex(ValueError, 'SURVEYQQ_WORKERS'):
+            get_int_option('workers', {'SURVEYQQ_WORKERS': 'many'})
+
+    def test_bool_option(self):
+        self.assertTrue(get_bool_option('skip_unchanged', {'SURVEYQQ_SKIP_UNCHANGED': 'Yes'}))
+        self.assertFalse(get_bool_option('skip_unchanged', {'SURVEYQQ_SKIP_UNCHANGED': '0'}))
+        self.assertIsNone(get_bool_option('skip_unchanged', {}))
+        with self.assertRaisesRegex(ValueError, 'SURVEYQQ_SKIP_UNCHANGED'):
+            get_bool_option('skip_unchanged', {'SURVEYQQ_SKIP_UNCHANGED': 'maybe'})
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
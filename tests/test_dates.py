@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import datetime
+import unittest
+
+from grimoire_elk_surveyqq.enriched.dates import (datetime_to_epoch,
+                                                  diff_days,
+                                                  epoch_to_datetime,
+                                                  parse_date,
+                                                  str_to_epoch)
+
+
+class TestDates(unittest.TestCase):
+    """Date helpers of the enricher"""
+
+    def test_parse_date(self):
+        date = parse_date('2021-03-01T10:20:30+08:00')
+        self.assertEqual(date.utcoffset(), datetime.timedelta(hours=8))
+        self.assertEqual(date.hour, 10)
+
+        date = parse_date('2021-03-01T10:20:30')
+        self.assertEqual(date.tzinfo, datetime.timezone.utc)
+
+        date = parse_date('Mon, 01 Mar 2021 10:20:30 +0000')
+        self.assertEqual(date.isoformat(), '2021-03-01T10:20:30+00:00')
+
+    def test_epoch(self):
+        self.assertIsNone(str_to_epoch(None))
+        self.assertEqual(str_to_epoch('1970-01-02T08:00:00+08:00'), 86400)
+        self.assertEqual(datetime_to_epoch(datetime.datetime(1970, 1, 2)), 86400)
+        self.assertEqual(epoch_to_datetime(86400).isoformat(), '1970-01-02T00:00:00+00:00')
+
+    def test_diff_days(self):
+        self.assertEqual(diff_days(0, 86400 * 1.5), 1.5)
+        self.assertEqual(diff_days(0, 1000), 0.01)
+        self.assertIsNone(diff_days(None, 1000))
+        self.assertIsNone(diff_days(0, None))
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import copy
+import unittest
+
+from benchmarks.generator import SurveyGenerator
+from grimoire_elk_surveyqq.enriched.fingerprints import get_config_fingerprint, get_fingerprint
+
+
+class TestFingerprints(unittest.TestCase):
+    """Fingerprints of the raw items"""
+
+    def setUp(self):
+        items = SurveyGenerator(seed=1).get_items(10)
+        self.item = next(item for item in items if isinstance(item['data']['issue_data'], dict))
+
+    def test_stable(self):
+        self.assertEqual(get_fingerprint(self.item), get_fingerprint(copy.deepcopy(self.item)))
+
+    def test_ignored_fields(self):
+        """Fields not read by the enricher do not change the fingerprint"""
+
+        item = copy.deepcopy(self.item)
+        item['timestamp'] = 0
+        item['data']['issue_data']['body'] = 'changed'
+
+        self.assertEqual(get_fingerprint(self.item), get_fingerprint(item))
+
+    def test_changes(self):
+        fingerprint = get_fingerprint(self.item)
+
+        item = copy.deepcopy(self.item)
+        item['data']['issue_data']['updated_at'] = '2030-01-01T00:00:00+08:00'
+        self.assertNotEqual(get_fingerprint(item), fingerprint)
+
+        item = copy.deepcopy(self.item)
+        item['data']['comment_data'].append({})
+        self.assertNotEqual(get_fingerprint(item), fingerprint)
+
+        item = copy.deepcopy(self.item)
+        item['data']['answer'][0]['questions'][3]['text'] = '0'
+        self.assertNotEqual(get_fingerprint(item), fingerprint)
+
+    def test_config(self):
+        """Changes in the configuration of the enricher change the fingerprint"""
+
+        config = {'projects': {'gitee': {'https://gitee.com/openeuler/kernel': 'kernel'}}, 'sortinghat': None}
+        fingerprint = get_fingerprint(self.item, get_config_fingerprint(config))
+
+        self.assertNotEqual(fingerprint, get_fingerprint(self.item))
+        self.assertEqual(fingerprint, get_fingerprint(self.item, get_config_fingerprint(copy.deepcopy(config))))
+
+        config['projects']['gitee']['https://gitee.com/openeuler/docs'] = 'docs'
+        self.assertNotEqual(fingerprint, get_fingerprint(self.item, get_config_fingerprint(config)))
+
+    def test_identity(self):
+        """Answers are enriched again when their respondent is merged"""
+
+        fingerprint = get_fingerprint(self.item, identity=['sh_id', 'uuid'])
+
+        self.assertEqual(fingerprint, get_fingerprint(self.item, identity=['sh_id', 'uuid']))
+        self.assertNotEqual(fingerprint, get_fingerprint(self.item, identity=['sh_id', 'other_uuid']))
+        self.assertNotEqual(fingerprint, get_fingerprint(self.item, identity=[None, None]))
+
+    def test_wrong_issue(self):
+        item = copy.deepcopy(self.item)
+        item['data']['issue_data'] = "issue not found"
+
+        self.assertNotEqual(get_fingerprint(item), get_fingerprint(self.item))
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import unittest
+
+from benchmarks.generator import SurveyGenerator
+from grimoire_elk_surveyqq.enriched.bots import DEFAULT_BOTS, BotDetector
+from grimoire_elk_surveyqq.enriched.comments import CommentIndex
+from grimoire_elk_surveyqq.identities.surveyqq import SurveyqqIdentities
+
+
+class TestSurveyqqIdentities(unittest.TestCase):
+    """Anonymization of the survey items"""
+
+    def setUp(self):
+        items = SurveyGenerator(seed=1).get_items(50)
+        self.item = next(item for item in items
+                         if isinstance(item['data']['issue_data'], dict) and item['data']['comment_data'])
+        self.data = self.item['data']
+
+    def tearDown(self):
+        SurveyqqIdentities.set_bots(DEFAULT_BOTS)
+
+    def test_anonymize_respondent(self):
+        """Respondent and issue users are hashed the same way"""
+
+        author = self.data['issue_data']['user']['login']
+        self.data['answer'][0]['questions'][0]['text'] = author
+
+        SurveyqqIdentities.anonymize_item(self.item)
+
+        hashed = self.data['issue_data']['user']['login']
+        self.assertNotEqual(hashed, author)
+        self.assertEqual(self.data['answer'][0]['questions'][0]['text'], hashed)
+
+    def test_bots(self):
+        """Bots are flagged before their names are hashed"""
+
+        self.data['comment_data'][0]['user'] = {'login': 'ci-bot', 'name': 'ci-bot'}
+        self.data['comment_data'][0]['created_at'] = '2000-01-01T00:00:00+08:00'
+
+        SurveyqqIdentities.anonymize_item(self.item)
+
+        user = self.data['comment_data'][0]['user']
+        self.assertNotIn('bot', user['login'])
+        self.assertTrue(user['bot'])
+        self.assertFalse(self.data['issue_data']['user']['bot'])
+
+        index = CommentIndex(self.data['issue_data'], self.data['comment_data'])
+        self.assertIsNotNone(index.first_bot_ts)
+        self.assertNotIn(user['login'], index.responders)
+
+    def test_set_bots(self):
+        login = self.data['comment_data'][0]['user']['login']
+        SurveyqqIdentities.set_bots(BotDetector(logins=[login]))
+
+        SurveyqqIdentities.anonymize_item(self.item)
+
+        self.assertTrue(self.data['comment_data'][0]['user']['bot'])
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import unittest
+
+from grimoire_elk_surveyqq import metrics
+from grimoire_elk_surveyqq.metrics import Metrics, get_environ_metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """Metrics of the stages of the backends"""
+
+    def tearDown(self):
+        metrics._environ_metrics = None
+
+    def test_disabled(self):
+        collector = Metrics()
+        with collector.stage('enrich'):
+            pass
+        collector.inc('raw_items')
+
+        self.assertEqual(collector.get_summary(), {'stages': {}, 'counters': {}})
+
+    def test_enabled(self):
+        collector = Metrics(enabled=True)
+        with collector.stage('enrich'):
+            pass
+        with self.assertRaises(ValueError):
+            with collector.stage('enrich'):
+                raise ValueError()
+        collector.inc('raw_items', 2)
+
+        summary = collector.get_summary()
+        self.assertEqual(summary['stages']['enrich']['count'], 2)
+        self.assertEqual(summary['stages']['enrich']['errors'], 1)
+        self.assertEqual(summary['counters'], {'raw_items': 2})
+        self.assertIn('surveyqq_raw_items_total 2', collector.get_prometheus())
+
+    def test_environ_metrics(self):
+        self.assertIsNone(get_environ_metrics({}))
+        self.assertIsNone(get_environ_metrics({'SURVEYQQ_METRICS': 'false'}))
+
+        environ = {'SURVEYQQ_METRICS': 'true', 'SURVEYQQ_METRICS_TEXTFILE': 'surveyqq.prom',
+                   'SURVEYQQ_METRICS_INTERVAL': '60'}
+        collector = get_environ_metrics(environ)
+
+        self.assertTrue(collector.enabled)
+        self.assertEqual(collector.textfile, 'surveyqq.prom')
+        self.assertEqual(collector.log_interval, 60)
+        self.assertIs(get_environ_metrics(environ), collector)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
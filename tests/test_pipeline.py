@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import json
+import unittest
+
+from benchmarks.generator import SurveyGenerator
+from grimoire_elk_surveyqq.bulk import BulkBuffer
+from grimoire_elk_surveyqq.identities.surveyqq import SurveyqqIdentities
+from grimoire_elk_surveyqq.metrics import Metrics
+from grimoire_elk_surveyqq.pipeline import stream_items
+
+
+class MockedElastic:
+    """Elasticsearch index keeping the documents of the bulk requests"""
+
+    max_items_bulk = 10
+
+    def __init__(self):
+        self.docs = {}
+        self.requests = 0
+
+    def get_bulk_url(self):
+        return 'http://localhost:9200/index/_bulk'
+
+    def safe_put_bulk(self, url, bulk_json):
+        self.requests += 1
+        lines = bulk_json.decode('utf-8').splitlines()
+        for action, doc in zip(lines[::2], lines[1::2]):
+            self.docs[json.loads(action)['index']['_id']] = json.loads(doc)
+        return len(lines) // 2
+
+
+class MockedOcean:
+    """Raw backend with the methods used by `stream_items`"""
+
+    identities = SurveyqqIdentities
+    project = None
+
+    def __init__(self, anonymize=False):
+        self.elastic = MockedElastic()
+        self.anonymize = anonymize
+        self.metrics = Metrics(enabled=True)
+
+    def add_update_date(self, item):
+        item['metadata__updated_on'] = item['updated_on']
+
+    def _fix_item(self, item):
+        pass
+
+    def drop_item(self, item):
+        return False
+
+    def get_field_unique_id(self):
+        return 'uuid'
+
+
+class MockedEnrich:
+    """Enrich backend recording the identities added to SortingHat"""
+
+    sortinghat = True
+
+    def __init__(self, quarantine_index=None):
+        self.elastic = MockedElastic()
+        self.quarantine_index = quarantine_index
+        self.quarantine = MockedElastic()
+        self.sh_identities = []
+        self.enriched = []
+
+    def get_field_unique_id(self):
+        return 'uuid'
+
+    def get_quarantine_buffer(self, max_bytes):
+        if not self.quarantine_index:
+            return None
+        return BulkBuffer(self.quarantine, max_bytes)
+
+    def validate_items(self, items, quarantine_buffer=None):
+        for item in items:
+            if item['uuid'].startswith('malformed') and quarantine_buffer:
+                quarantine_buffer.add(item['uuid'], {'uuid': item['uuid']})
+        return [item for item in items if not item['uuid'].startswith('malformed')]
+
+    def get_identities(self, item):
+        return [{'username': item['uuid'], 'email': None, 'name': None}]
+
+    def add_sh_identities(self, identities):
+        self.sh_identities.extend(identities)
+
+    def get_rich_items(self, items):
+        # Respondents are registered before their items are enriched
+        registered = {identity['username'] for identity in self.sh_identities}
+        assert all(item['uuid'] in registered for item in items)
+        self.enriched.append(len(items))
+        return [{'uuid': item['uuid']} for item in items]
+
+
+class TestStreamItems(unittest.TestCase):
+    """Streaming of the raw items to the raw and enriched indexes"""
+
+    def setUp(self):
+        self.items = SurveyGenerator(seed=1).get_items(25)
+
+    def test_raw_only(self):
+        ocean = MockedOcean()
+
+        self.assertEqual(stream_items(ocean, None, self.items), (25, 0))
+        self.assertEqual(len(ocean.elastic.docs), 25)
+
+    def test_enrich(self):
+        ocean = MockedOcean()
+        enrich = MockedEnrich()
+        self.items[3]['uuid'] = 'malformed'
+
+        self.assertEqual(stream_items(ocean, enrich, self.items), (25, 24))
+        self.assertEqual(enrich.enriched, [9, 10, 5])
+        self.assertEqual(len(enrich.sh_identities), 24)
+        self.assertNotIn('malformed', enrich.elastic.docs)
+        self.assertIn('malformed', ocean.elastic.docs)
+
+    def test_quarantine(self):
+        """Malformed items are quarantined in bulk"""
+
+        ocean = MockedOcean()
+        enrich = MockedEnrich(quarantine_index='surveyqq_quarantine')
+        for i, item in enumerate(self.items[:8]):
+            item['uuid'] = 'malformed-%d' % i
+
+        self.assertEqual(stream_items(ocean, enrich, self.items), (25, 17))
+        self.assertEqual(len(enrich.quarantine.docs), 8)
+        self.assertEqual(enrich.quarantine.requests, 1)
+        self.assertEqual(enrich.enriched, [2, 10, 5])
+
+    def test_anonymize(self):
+        ocean = MockedOcean(anonymize=True)
+        logins = {item['data']['issue_data']['user']['login'] for item in self.items
+                  if isinstance(item['data']['issue_data'], dict)}
+
+        stream_items(ocean, None, self.items)
+
+        for doc in ocean.elastic.docs.values():
+            issue = doc['data']['issue_data']
+            if isinstance(issue, dict):
+                self.assertNotIn(issue['user']['login'], logins)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import unittest
+
+from grimoire_elk_surveyqq.enriched.projects import ProjectIndex, get_repository_key
+
+
+class TestProjects(unittest.TestCase):
+    """Index of the projects of the repositories"""
+
+    def test_repository_key(self):
+        self.assertEqual(get_repository_key('https://gitee.com/OpenEuler/Kernel.git'),
+                         ('gitee.com', 'openeuler', 'kernel'))
+        self.assertEqual(get_repository_key(' https://gitee.com/openeuler/kernel/issues/I1 '),
+                         ('gitee.com', 'openeuler', 'kernel'))
+        self.assertIsNone(get_repository_key('https://gitee.com/openeuler'))
+        self.assertIsNone(get_repository_key(None))
+        self.assertIsNone(get_repository_key(42))
+
+    def test_sections(self):
+        """Repository sections are checked before the other sections"""
+
+        prjs_map = {
+            'git': {'https://gitee.com/openeuler/kernel': 'git-project',
+                    'https://gitee.com/openeuler/docs': 'docs'},
+            'gitee': {'https://gitee.com/openeuler/kernel': 'gitee-project'}
+        }
+        index = ProjectIndex(prjs_map)
+
+        self.assertEqual(index.get_project('https://gitee.com/openeuler/kernel/issues/I1'), 'gitee-project')
+        self.assertEqual(index.get_project('https://gitee.com/openeuler/docs/issues/I2'), 'docs')
+        self.assertIsNone(index.get_project('https://gitee.com/openeuler/other/issues/I3'))
+        self.assertIsNone(index.get_project('issue not found'))
+
+    def test_origin_project(self):
+        index = ProjectIndex({})
+        calls = []
+
+        def find_project():
+            calls.append(1)
+            return 'project'
+
+        self.assertEqual(index.get_origin_project('origin', find_project), 'project')
+        self.assertEqual(index.get_origin_project('origin', find_project), 'project')
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import copy
+import unittest
+
+from grimoire_elk_surveyqq.enriched.questionnaire import QuestionnaireLayouts
+
+
+def get_answer(survey_id=1, titles=None):
+    titles = titles or ['Gitee login', 'Email', 'Issue link', 'Score',
+                        'Reasons', 'Why', 'Appeal']
+    questions = [{'id': survey_id * 100 + i, 'title': title, 'text': 'text %d' % i,
+                  'options': [{'text': 'option %d' % i}]}
+                 for i, title in enumerate(titles)]
+    return {'survey_id': survey_id, 'questions': questions}
+
+
+class TestQuestionnaireLayouts(unittest.TestCase):
+    """Location of the survey fields in the answers"""
+
+    def test_extract(self):
+        layouts = QuestionnaireLayouts()
+        fields = layouts.extract(get_answer())
+
+        self.assertEqual(fields['user_login'], 'text 0')
+        self.assertEqual(fields['survey_score'], 'text 3')
+        self.assertEqual(fields['user_appeal'], ['option 6'])
+
+    def test_reordered_questions(self):
+        """Answers with reordered questions are read by question id"""
+
+        layouts = QuestionnaireLayouts()
+        layouts.extract(get_answer())
+
+        answer = get_answer()
+        answer['questions'].reverse()
+        fields = layouts.extract(answer)
+
+        self.assertEqual(fields['user_login'], 'text 0')
+        self.assertEqual(fields['survey_score'], 'text 3')
+        self.assertEqual(fields['user_appeal'], ['option 6'])
+
+    def test_reordered_first_answer(self):
+        """Fields are located by their question ids when the first answer is reordered"""
+
+        answer = get_answer()
+        answer['questions'].reverse()
+        question_ids = {'user_login': 100, 'survey_score': 103}
+        layouts = QuestionnaireLayouts(question_ids=question_ids)
+        fields = layouts.extract(answer)
+
+        self.assertEqual(fields['user_login'], 'text 0')
+        self.assertEqual(fields['survey_score'], 'text 3')
+
+    def test_titles(self):
+        answer = get_answer(titles=['Score', 'Gitee login', 'Email', 'Issue link',
+                                    'Reasons', 'Why', 'Appeal'])
+        layouts = QuestionnaireLayouts(titles={'user_login': 'login', 'user_email': 'Email',
+                                               'issue_link': 'link', 'survey_score': 'Score'})
+        fields = layouts.extract(answer)
+
+        self.assertEqual(fields['user_login'], 'text 1')
+        self.assertEqual(fields['survey_score'], 'text 0')
+
+    def test_partial_layout_not_cached(self):
+        """A malformed first answer does not spoil the layout of its survey"""
+
+        layouts = QuestionnaireLayouts()
+        answer = get_answer()
+        del answer['questions'][4:]
+        fields = layouts.extract(answer)
+
+        self.assertEqual(fields['user_login'], 'text 0')
+        self.assertEqual(fields['user_appeal'], [])
+        self.assertEqual(layouts.layouts, {})
+
+        fields = layouts.extract(get_answer())
+        self.assertEqual(fields['user_appeal'], ['option 6'])
+        self.assertEqual(list(layouts.layouts), [1])
+
+    def test_questions_without_ids(self):
+        """Answers whose questions have no ids are read by position or title"""
+
+        layouts = QuestionnaireLayouts()
+        answer = get_answer()
+        for question in answer['questions']:
+            del question['id']
+        del answer['survey_id']
+        fields = layouts.extract(answer)
+
+        self.assertEqual(fields['user_login'], 'text 0')
+        self.assertEqual(fields['survey_score'], 'text 3')
+        self.assertEqual(fields['user_appeal'], ['option 6'])
+        self.assertEqual(list(layouts.layouts), [tuple(q['title'] for q in answer['questions'])])
+
+        answer = get_answer(titles=['Score', 'Gitee login', 'Email', 'Issue link',
+                                    'Reasons', 'Why', 'Appeal'])
+        for question in answer['questions']:
+            del question['id']
+        layouts = QuestionnaireLayouts(titles={'user_login': 'login', 'survey_score': 'Score'})
+        fields = layouts.extract(answer)
+
+        self.assertEqual(fields['user_login'], 'text 1')
+        self.assertEqual(fields['survey_score'], 'text 0')
+
+    def test_some_questions_without_ids(self):
+        """Layouts of answers with only some ids are used but not cached"""
+
+        layouts = QuestionnaireLayouts()
+        answer = get_answer()
+        del answer['questions'][0]['id']
+
+        self.assertEqual(layouts.extract(answer)['user_login'], 'text 0')
+        self.assertEqual(layouts.layouts, {})
+
+        layouts.extract(get_answer())
+        answer = get_answer()
+        answer['questions'].reverse()
+        self.assertEqual(layouts.extract(answer)['user_login'], 'text 0')
+
+    def test_origin_key(self):
+        """Layouts are cached by origin, then by survey id"""
+
+        layouts = QuestionnaireLayouts()
+        first = layouts.get(get_answer(), origin='https://wj.qq.com/s/1')
+        second = layouts.get(get_answer(survey_id=2), origin='https://wj.qq.com/s/2')
+
+        self.assertIsNot(first, second)
+        self.assertIs(layouts.get(get_answer(), origin='https://wj.qq.com/s/1'), first)
+        self.assertEqual(set(layouts.layouts), {'https://wj.qq.com/s/1', 'https://wj.qq.com/s/2'})
+
+        answer = copy.deepcopy(get_answer(survey_id=3))
+        del answer['survey_id']
+        layouts.get(answer)
+        self.assertIn(frozenset(range(300, 307)), layouts.layouts)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import unittest
+
+from grimoire_elk_surveyqq.enriched.rollups import SurveyRollups, get_utc_day
+
+
+class TestRollups(unittest.TestCase):
+    """Daily rollups of survey answers"""
+
+    def test_utc_day(self):
+        self.assertEqual(get_utc_day('2021-03-02T02:00:00+08:00'), '2021-03-01')
+        self.assertEqual(get_utc_day('2021-03-01T23:00:00-05:00'), '2021-03-02')
+        self.assertIsNone(get_utc_day(None))
+
+    def test_rollups(self):
+        rollups = SurveyRollups()
+        rollups.add({'grimoire_creation_date': '2021-03-02T02:00:00+08:00', 'project': 'p',
+                     'survey_score': '9', 'issue_labels': ['bug'], 'issue_milestone': 'v1',
+                     'issue_satisfied': ['fast']})
+        rollups.add({'grimoire_creation_date': '2021-03-01T10:00:00+00:00', 'project': 'p',
+                     'survey_score': '3', 'issue_labels': [], 'issue_milestone': None,
+                     'issue_unsatisfied': ['slow', 'rude']})
+
+        items = {item['uuid']: item for item in rollups.get_items('2021-03-03T00:00:00')}
+
+        score = items['score_2021-03-01_p_all_']
+        self.assertEqual(score['answers'], 2)
+        self.assertEqual(score['score_sum'], 12)
+        self.assertEqual(score['promoters'], 1)
+        self.assertEqual(score['detractors'], 1)
+        self.assertEqual(score['passives'], 0)
+
+        self.assertEqual(items['score_2021-03-01_p_label_bug']['answers'], 1)
+        self.assertEqual(items['score_2021-03-01_p_milestone_v1']['score_sum'], 9)
+        self.assertEqual(items['reason_2021-03-01_p_all__issue_unsatisfied_slow']['count'], 1)
+        self.assertEqual(items['reason_2021-03-01_p_label_bug_issue_satisfied_fast']['count'], 1)
+        self.assertEqual(len(items), 8)
+
+    def test_wrong_score(self):
+        rollups = SurveyRollups()
+        rollups.add({'grimoire_creation_date': '2021-03-01T10:00:00+00:00', 'survey_score': None})
+
+        item = next(rollups.get_items('2021-03-03T00:00:00'))
+        self.assertEqual(item['answers'], 1)
+        self.assertEqual(item['score_sum'], 0)
+        self.assertEqual(item['project'], '')
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+import collections
+import sys
+import unittest
+
+from grimoire_elk_surveyqq.utils import LazyConnector
+
+
+class TestLazyConnector(unittest.TestCase):
+    """Connectors imported the first time they are used"""
+
+    def test_compare_without_import(self):
+        connector = LazyConnector('surveyqq_missing.module', 'Backend')
+
+        self.assertEqual(connector, LazyConnector('surveyqq_missing.module', 'Backend'))
+        self.assertNotEqual(connector, LazyConnector('surveyqq_missing.module', 'Other'))
+        self.assertEqual(len({connector, LazyConnector('surveyqq_missing.module', 'Backend')}), 1)
+        self.assertEqual(connector.__name__, 'Backend')
+        self.assertEqual(connector.__qualname__, 'Backend')
+        self.assertEqual(connector.__module__, 'surveyqq_missing.module')
+        self.assertNotIn('surveyqq_missing.module', sys.modules)
+
+    def test_compare_with_class(self):
+        connector = LazyConnector('collections', 'OrderedDict')
+
+        self.assertEqual(connector, collections.OrderedDict)
+        self.assertEqual(collections.OrderedDict, connector)
+        self.assertNotEqual(connector, collections.Counter)
+        self.assertNotEqual(connector, 'OrderedDict')
+
+    def test_resolve(self):
+        connector = LazyConnector('collections', 'OrderedDict')
+
+        self.assertIsInstance(connector(), collections.OrderedDict)
+        self.assertIs(connector.resolve(), collections.OrderedDict)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2021 Huawei
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#   Yehui Wang <yehui.wang.mdh@gmail.com>
+#
+
+
+import unittest
+
+from benchmarks.generator import SurveyGenerator
+from grimoire_elk_surveyqq.enriched.questionnaire import QuestionnaireLayouts
+from grimoire_elk_surveyqq.enriched.validation import validate_item, get_quarantine_item
+
+
+class TestValidateItem(unittest.TestCase):
+    """Validation of raw survey items"""
+
+    def setUp(self):
+        self.layouts = QuestionnaireLayouts()
+        self.items = SurveyGenerator(seed=1, invalid_ratio=0.2).get_items(200)
+        self.issue_items = [item for item in self.items if isinstance(item['data']['issue_data'], dict)]
+
+    def test_valid_items(self):
+        """Generated items are valid, including those with a wrong issue link"""
+
+        for item in self.items:
+            self.assertEqual(validate_item(item, self.layouts), [])
+
+    def test_missing_assignee(self):
+        item = self.issue_items[0]
+        del item['data']['issue_data']['assignee']
+
+        self.assertEqual(validate_item(item, self.layouts), ["missing issue assignee"])
+
+    def test_missing_finished_at(self):
+        """Closed issues need the date they were closed"""
+
+        item = next(item for item in self.issue_items if item['data']['issue_data']['state'] == 'closed')
+        del item['data']['issue_data']['finished_at']
+
+        self.assertEqual(validate_item(item, self.layouts), ["wrong issue finished_at date"])
+
+    def test_open_issue_without_finished_at(self):
+        item = next(item for item in self.issue_items if item['data']['issue_data']['state'] == 'open')
+        item['data']['issue_data']['finished_at'] = None
+
+        self.assertEqual(validate_item(item, self.layouts), [])
+
+    def test_wrong_comment_date(self):
+        item = next(item for item in self.issue_items if item['data']['comment_data'])
+        item['data']['comment_data'][0]['created_at'] = 'garbage'
+
+        self.assertEqual(validate_item(item, self.layouts), ["wrong comment in comment_data"])
+
+    def test_wrong_issue_user(self):
+        item = self.issue_items[0]
+        del item['data']['issue_data']['user']['name']
+
+        self.assertEqual(validate_item(item, self.layouts), ["wrong issue user"])
+
+    def test_wrong_score(self):
+        item = self.items[0]
+        item['data']['answer'][0]['questions'][3]['text'] = 'ten'
+
+        self.assertEqual(validate_item(item, self.layouts), ["score is not a number"])
+
+        item['data']['answer'][0]['questions'][3]['text'] = '11'
+        self.assertEqual(validate_item(item, self.layouts), ["score out of range"])
+
+    def test_question_without_id(self):
+        """Questions without id are read by position"""
+
+        item = self.items[0]
+        del item['data']['answer'][0]['questions'][0]['id']
+
+        self.assertEqual(validate_item(item, self.layouts), [])
+        self.assertEqual(validate_item(self.items[1], self.layouts), [])
+
+    def test_answer_without_ids(self):
+        for item in self.items:
+            for question in item['data']['answer'][0]['questions']:
+                del question['id']
+
+        for item in self.items:
+            self.assertEqual(validate_item(item, self.layouts), [])
+
+    def test_short_answer(self):
+        item = self.items[0]
+        del item['data']['answer'][0]['questions'][5:]
+
+        reasons = validate_item(item, self.layouts)
+        self.assertEqual(reasons, ["missing question for participated_reason",
+                                   "missing question for user_appeal"])
+        for other in self.items[1:]:
+            self.assertEqual(validate_item(other, self.layouts), [])
+
+    def test_wrong_started_at(self):
+        item = self.items[0]
+        item['data']['started_at'] = None
+
+        self.assertEqual(validate_item(item, self.layouts), ["wrong started_at date"])
+
+    def test_errors_are_reasons(self):
+        """Unexpected errors are returned as reasons"""
+
+        item = self.items[0]
+        item['data']['answer'][0]['questions'] = [None]
+
+        reasons = validate_item(item, self.layouts)
+        self.assertEqual(len(reasons), 1)
+        self.assertTrue(reasons[0].startswith("validation error"))
+
+    def test_wrong_item(self):
+        self.assertEqual(validate_item({'category': 'pull_request'}, self.layouts),
+                         ["unknown category pull_request"])
+        self.assertEqual(validate_item({'category': 'issue', 'uuid': '1'}, self.layouts), ["missing data"])
+
+    def test_quarantine_item(self):
+        item = self.items[0]
+        quarantined = get_quarantine_item(item, ["missing answer"], '2021-01-01T00:00:00')
+
+        self.assertEqual(quarantined['uuid'], item['uuid'])
+        self.assertEqual(quarantined['reasons'], ["missing answer"])
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')